@@ -1,5 +1,7 @@
+import os
+import threading
+
 import streamlit as st
-import base64
 
 # --- CONFIGURAZIONE AUTO-DEPLOY (SECRETS) ---
 try:
@@ -14,13 +16,13 @@ except FileNotFoundError:
     st.error("❌ ERRORE CRITICO: File secrets.toml non trovato.")
     st.stop()
 
-# Nota: Non importiamo più os o base64 se non servono
+# Nota: il video non passa più da base64, è servito come file statico
 
-# Importiamo i moduli solo dopo aver settato la chiave,
-# così logic.py può leggerla se necessario (anche se idealmente andrebbe rifattorizzato)
-from engine import generate_trajectory_simulation
-import logic
-import utils
+# Avvio a freddo: qui solo moduli leggeri. pipeline/utils (openai, pydantic,
+# requests, PyMuPDF) servono dallo step 1 e vengono importati lì, oppure prima
+# dal thread di warm-up in background (controllo: benchmarks/import_budget.py).
+import settings
+import telemetry
 
 # --- CONFIGURAZIONE PAGINA ---
 st.set_page_config(
@@ -31,21 +33,71 @@ st.set_page_config(
 )
 
 
+# --- WARM-UP MODULI E CONNESSIONI LLM ---
+# Una volta per processo, in background mentre la landing è già visibile:
+# importa i moduli pesanti dell'analisi e apre il pool di connessioni verso
+# OpenRouter (quest'ultimo disattivabile dai Secrets).
+def background_warmup(open_connections):
+    import llm_client
+    import pipeline  # noqa: F401  Solo pre-caricamento (engine, logic, utils)
+
+    if open_connections:
+        llm_client.warm_up()
+
+
+@st.cache_resource
+def start_llm_warmup():
+    open_connections = settings.get_flag("OPENROUTER_WARMUP", True)
+    threading.Thread(
+        target=background_warmup, args=(open_connections,), daemon=True
+    ).start()
+
+
+start_llm_warmup()
+
+
+# --- ENDPOINT METRICHE (PROMETHEUS) ---
+# Durate per stadio, byte HTTP e token LLM su http://<host>:METRICS_PORT/metrics.
+# Una volta per processo; METRICS_PORT = 0 nei Secrets lo disattiva.
+@st.cache_resource
+def start_metrics_endpoint():
+    port = int(settings.get_setting("METRICS_PORT", 9464))
+    if port:
+        telemetry.start_metrics_server(port)
+
+
+start_metrics_endpoint()
+
+
 # --- CARICAMENTO CSS ---
-def local_css(file_name):
+# Letto una sola volta per processo, non ad ogni rerun
+@st.cache_resource
+def load_css(file_name):
     with open(file_name) as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+        return f.read()
+
+
+def local_css(file_name):
+    st.markdown(f"<style>{load_css(file_name)}</style>", unsafe_allow_html=True)
 
 
 local_css("assets/style.css")
 
 # --- BACKGROUND VIDEO HACK ---
 # Streamlit non ha bg video nativo. Uso HTML puro fissato.
-try:
-    video_file = open("assets/Galactic2.mp4", "rb")
-    video_bytes = video_file.read()
-    video_b64 = base64.b64encode(video_bytes).decode()
+# Il video è servito da Streamlit come file statico (.streamlit/config.toml,
+# enableStaticServing) e referenziato per URL: il browser lo mette in cache
+# e ogni rerun invia solo il tag <video>, non più MB di base64.
+VIDEO_FILE = "static/Galactic2.mp4"
+VIDEO_URL = "app/static/Galactic2.mp4"
+
+
+@st.cache_resource
+def video_available(path):
+    return os.path.exists(path)
 
+
+if video_available(VIDEO_FILE):
     st.markdown(
         f"""
         <style>
@@ -61,14 +113,14 @@ try:
         }}
         </style>
         <video autoplay muted loop playsinline class="video-bg">
-            <source src="data:video/mp4;base64,{video_b64}" type="video/mp4">
+            <source src="{VIDEO_URL}" type="video/mp4">
         </video>
         """,
         unsafe_allow_html=True,
     )
-except FileNotFoundError:
+else:
     st.error(
-        "File 'Galactic2.mp4' non trovato. Assicurati che sia nella cartella assets."
+        "File 'Galactic2.mp4' non trovato. Assicurati che sia nella cartella static."
     )
 
 # --- NAVBAR ---
@@ -87,6 +139,69 @@ st.markdown(
 )
 
 
+# --- RENDERING TRAIETTORIE ---
+# Ordine dei campi di CTSAnalysis (vedi engine.STREAM_FIELDS)
+TRAJECTORY_FIELDS = (
+    "core_vector",
+    "trajectory_1_strategic",
+    "trajectory_2_challenge",
+    "trajectory_3_visionary",
+)
+
+# Campo -> (colonna, etichetta, colore) delle 3 card
+TRAJECTORY_CARDS = {
+    "trajectory_1_strategic": (0, "STRATEGIC PATH", "#4CAF50"),
+    "trajectory_2_challenge": (1, "CHALLENGE PATH", "#FFC107"),
+    "trajectory_3_visionary": (2, "VISIONARY PATH", "#F44336"),
+}
+
+
+# Funzione helper per card
+def draw_trajectory_card(column, trajectory, type_label, color):
+    with column:
+        st.markdown(
+            f"<h3 style='color:{color}'>{type_label}</h3>",
+            unsafe_allow_html=True,
+        )
+        with st.container(border=True):
+            st.markdown(f"#### {trajectory.title}")
+            st.caption(f"Probabilità: {trajectory.probability}")
+            st.write(trajectory.description)
+            st.markdown("---")
+            st.markdown("**Progetto Ipotetico:**")
+            st.markdown(
+                f"""
+                <div class="project-box">
+                    <span style="font-size: 0.8rem; text-transform: uppercase; color: rgba(255,255,255,0.5); letter-spacing: 1px;">PROGETTO IPOTETICO</span>
+                    <p style="margin-top: 0.5rem; font-size: 0.95rem; line-height: 1.4;">{trajectory.hypothetical_project}</p>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+
+
+def render_trajectory_field(container, layout, field, value):
+    """
+    Disegna un singolo campo di CTSAnalysis appena disponibile (streaming).
+    Il layout (core vector + 3 colonne) viene creato al primo campo ricevuto.
+    """
+    if not layout:
+        with container:
+            # Visualizzazione Risultati
+            st.divider()
+            layout["core"] = st.empty()
+            st.divider()
+            # Layout FULL WIDTH per le 3 Traiettorie
+            # Qui è la chiave: st.columns(3) viene chiamato nel contesto principale (wide)
+            layout["columns"] = st.columns(3)
+
+    if field == "core_vector":
+        layout["core"].markdown(f"## CORE VECTOR\n*{value}*")
+    elif field in TRAJECTORY_CARDS:
+        index, type_label, color = TRAJECTORY_CARDS[field]
+        draw_trajectory_card(layout["columns"][index], value, type_label, color)
+
+
 # --- SESSION STATE ---
 if "step" not in st.session_state:
     st.session_state.step = 0
@@ -119,6 +234,11 @@ with col_content:
 
 # --- STEP 1: INPUT E GENERAZIONE (FULL WIDTH) ---
 if st.session_state.step >= 1:
+    # Moduli dell'analisi: già in memoria se il warm-up in background ha finito
+    import job_store
+    import pipeline
+    import utils
+
     st.divider()  # Separatore visivo dopo il titolo
 
     # --- INPUT SECTION ---
@@ -206,9 +326,23 @@ if st.session_state.step >= 1:
     if "analyzing" not in st.session_state:
         st.session_state.analyzing = False
 
+    # Modalità combinata (1 sola chiamata LLM) attivabile dai Secrets
+    combined_mode = settings.get_flag("COMBINED_ANALYSIS", False)
+    analysis_inputs = {
+        "cv_text": cv_text,
+        "personality_text": personality_text,
+        "github_user": github_user,
+        "web_links": web_links,
+        "combined": combined_mode,
+    }
+
     # Area Bottone Finale (Centrato ma in contesto full width)
-    # Mostriamo il bottone SOLO se non stiamo già analizzando
-    if not st.session_state.analyzing:
+    # Il bottone compare se non stiamo analizzando, oppure se gli input sono
+    # cambiati rispetto all'analisi mostrata: un nuovo job parte solo col click
+    if (
+        not st.session_state.analyzing
+        or analysis_inputs != st.session_state.get("analysis_inputs")
+    ):
         c1, c2, c3 = st.columns([1, 1, 1])
         with c2:
             start_analysis = st.button(
@@ -216,120 +350,151 @@ if st.session_state.step >= 1:
             )
 
             if start_analysis:
+                # Input e chiave del job fissati al click: i rerun successivi
+                # (widget modificati) seguono solo questo job
+                st.session_state.analysis_inputs = analysis_inputs
+                st.session_state.analysis_key = job_store.job_key(
+                    cv_text, personality_text, github_user, web_links, combined_mode
+                )
                 st.session_state.analyzing = True
                 st.rerun()
 
     # --- ESECUZIONE ANALISI ---
     if st.session_state.analyzing:
+        submitted = st.session_state.analysis_inputs
         # Check validazione semplice
-        if not cv_text:
+        if not submitted["cv_text"]:
             st.error("Per favore, carica almeno il CV per procedere.")
             st.session_state.analyzing = False  # Reset stato per mostrare bottone
         else:
-            # --- VALIDAZIONE PRELIMINARE (Gate Check) ---
-            with st.spinner("Verifica accessibilità link digitali..."):
-                if web_links:
-                    is_valid, error_msg = utils.validate_optional_link(web_links)
-                    if not is_valid:
+            # --- JOB IN BACKGROUND (job_store.py) ---
+            # L'analisi gira su un worker, non nel thread dello script: i rerun
+            # (ogni interazione con i widget) ritrovano il job tramite la chiave
+            # salvata al click e rileggono gli eventi salvati, senza rifare
+            # fetch e chiamate LLM.
+            jobs = job_store.get_store()
+            analysis_key = st.session_state.analysis_key
+            job = jobs.get(analysis_key)
+
+            if job is None:
+                # --- VALIDAZIONE PRELIMINARE (Gate Check) ---
+                # Ogni URL viene verificato in parallelo (HEAD / GET parziale);
+                # le pagine già scaricate passano a get_web_dna senza riscaricarle.
+                prefetched = {}
+                st.session_state.link_report = None
+                with st.spinner("Verifica accessibilità link digitali..."):
+                    link_checks = utils.validate_links(submitted["web_links"])
+
+                if link_checks:
+                    invalid = [check for check in link_checks if not check.is_valid]
+                    report = "\n".join(
+                        f"{'✅' if check.is_valid else '❌'} {check.url}"
+                        + (f" — {check.error}" if check.error else "")
+                        for check in link_checks
+                    )
+                    if invalid:
                         # Feedback negativo nel placeholder dedicato
-                        portfolio_feedback.error(f"❌ Link non valido: {error_msg}")
+                        portfolio_feedback.error(report)
                         st.error(
-                            f"Errore nel link del portfolio: {error_msg}. Correggi o svuota il campo."
+                            f"Errore nel link del portfolio: {invalid[0].url} ({invalid[0].error}). Correggi o svuota il campo."
                         )
                         st.session_state.analyzing = (
                             False  # Reset stato per permettere correzione
                         )
                         st.stop()  # Blocca l'esecuzione QUI.
                     else:
-                        portfolio_feedback.success("✅ Link verificato e accessibile.")
+                        st.session_state.link_report = report
+                    prefetched = {
+                        check.url: check.body
+                        for check in link_checks
+                        if check.body is not None
+                    }
+
+                # Span radice "analysis": tutti gli stadi della pipeline ne sono figli
+                job = jobs.submit(
+                    analysis_key,
+                    pipeline.run_analysis,
+                    args=(
+                        submitted["cv_text"],
+                        submitted["personality_text"],
+                        submitted["github_user"],
+                        submitted["web_links"],
+                    ),
+                    kwargs={
+                        "combined": submitted["combined"],
+                        "prefetched": prefetched,
+                    },
+                    name="analysis",
+                )
+
+            if st.session_state.get("link_report"):
+                portfolio_feedback.success(st.session_state.link_report)
 
             with st.status(
                 "Inizializzazione scansione neurale...", expanded=True
             ) as status:
-                # 0. Data Enrichment (New)
-                st.write("Analisi Digital Footprint (GitHub & Web)...")
-                github_data = utils.get_github_dna(github_user)
-                web_data = utils.get_web_dna(web_links)
-
-                # 1. Analisi Archetipo (logic.py)
-                st.write("Identificazione Archetipo Visionario...")
-                archetype_data = logic.get_archetype_analysis(
-                    personality_text + " " + cv_text
+                # Log degli stadi sopra, risultati (progressivi) sotto
+                stage_log = st.container()
+                result_area = st.container()
+
+                # Stadi indipendenti in parallelo (pipeline.py):
+                # GitHub, Web e Archetipo partono insieme, le Traiettorie
+                # partono appena GitHub e Web sono pronti e arrivano in streaming.
+                stage_log.write(
+                    "Analisi Digital Footprint, Archetipo e Traiettorie in parallelo..."
                 )
+                cts_analysis = None
+                layout = {}
+                rendered = set()
+
+                # Eventi già salvati subito, poi quelli nuovi man mano che arrivano
+                for stage in job.follow():
+                    # Campi delle traiettorie disegnati appena completi
+                    if stage.name == "trajectory_partial":
+                        field, value = stage.result
+                        render_trajectory_field(result_area, layout, field, value)
+                        rendered.add(field)
+                        continue
+
+                    with stage_log:
+                        st.write(
+                            f"✓ {pipeline.STAGE_LABELS[stage.name]} ({stage.elapsed:.1f}s)"
+                        )
+                    status.update(label=f"{pipeline.STAGE_LABELS[stage.name]}...")
+
+                    # 1. Analisi Archetipo (logic.py)
+                    if stage.name == "archetype":
+                        archetype_data = stage.result
+                        with stage_log:
+                            if "error" in archetype_data:
+                                st.error(f"Errore Archetipo: {archetype_data['error']}")
+                            else:
+                                st.markdown(
+                                    f"### Archetipo Identificato: **{archetype_data.get('archetype_title', 'Unknown')}**"
+                                )
+                                st.json(archetype_data, expanded=False)
 
-                if "error" in archetype_data:
-                    st.error(f"Errore Archetipo: {archetype_data['error']}")
-                else:
-                    st.markdown(
-                        f"### Archetipo Identificato: **{archetype_data.get('archetype_title', 'Unknown')}**"
-                    )
-                    st.json(archetype_data, expanded=False)
-
-                # 2. Generazione Traiettorie Future (engine.py)
-                st.write("Simulazione Traiettorie Future...")
-                cts_analysis = generate_trajectory_simulation(
-                    cv_text, personality_text, github_data, web_data
-                )
+                    # 2. Generazione Traiettorie Future (engine.py)
+                    elif stage.name == "trajectory":
+                        cts_analysis = stage.result
 
                 if cts_analysis:
-                    st.success("Simulazione Completata!")
-                    status.update(
-                        label="Sistema Pronto", state="complete", expanded=False
-                    )
-
-                    # Visualizzazione Risultati
-                    st.divider()
-                    st.markdown(f"## CORE VECTOR\n*{cts_analysis.core_vector}*")
-
-                    st.divider()
-
-                    # Layout FULL WIDTH per le 3 Traiettorie
-                    # Qui è la chiave: st.columns(3) viene chiamato nel contesto principale (wide)
-                    col1, col2, col3 = st.columns(3)
-
-                    # Funzione helper per card
-                    def draw_trajectory_card(column, trajectory, type_label, color):
-                        with column:
-                            st.markdown(
-                                f"<h3 style='color:{color}'>{type_label}</h3>",
-                                unsafe_allow_html=True,
+                    # Il risultato finale è validato: completiamo eventuali campi mancanti
+                    for field in TRAJECTORY_FIELDS:
+                        if field not in rendered:
+                            render_trajectory_field(
+                                result_area, layout, field, getattr(cts_analysis, field)
                             )
-                            with st.container(border=True):
-                                st.markdown(f"#### {trajectory.title}")
-                                st.caption(f"Probabilità: {trajectory.probability}")
-                                st.write(trajectory.description)
-                                st.markdown("---")
-                                st.markdown("**Progetto Ipotetico:**")
-                                st.markdown(
-                                    f"""
-                                    <div class="project-box">
-                                        <span style="font-size: 0.8rem; text-transform: uppercase; color: rgba(255,255,255,0.5); letter-spacing: 1px;">PROGETTO IPOTETICO</span>
-                                        <p style="margin-top: 0.5rem; font-size: 0.95rem; line-height: 1.4;">{trajectory.hypothetical_project}</p>
-                                    </div>
-                                    """,
-                                    unsafe_allow_html=True,
-                                )
 
-                    draw_trajectory_card(
-                        col1,
-                        cts_analysis.trajectory_1_strategic,
-                        "STRATEGIC PATH",
-                        "#4CAF50",
-                    )
-                    draw_trajectory_card(
-                        col2,
-                        cts_analysis.trajectory_2_challenge,
-                        "CHALLENGE PATH",
-                        "#FFC107",
-                    )
-                    draw_trajectory_card(
-                        col3,
-                        cts_analysis.trajectory_3_visionary,
-                        "VISIONARY PATH",
-                        "#F44336",
+                    stage_log.success("Simulazione Completata!")
+                    status.update(
+                        label="Sistema Pronto", state="complete", expanded=False
                     )
 
                 else:
+                    # Job fallito: lo scartiamo, così "PROCEDI" lo riesegue da capo
+                    jobs.discard(analysis_key)
+                    st.session_state.analyzing = False
                     st.error(
                         "Errore nella generazione delle traiettorie. Verifica la chiave API."
                     )
@@ -0,0 +1,298 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import context_packer
+import engine
+import logic
+import pipeline
+import telemetry
+import utils
+
+# Stima dei token di output per analisi (archetipo + 3 traiettorie)
+ESTIMATED_OUTPUT_TOKENS = 1200
+# Modello delle traiettorie usato dalla pipeline (default di engine.py)
+TRAJECTORY_MODEL = "gpt-4o-mini"
+
+
+class RateLimiter:
+    """
+    Limitatore a token bucket su due dimensioni: richieste/minuto e token/minuto.
+    acquire() blocca finché entrambe le quote sono disponibili.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed_minutes = (now - self._updated) / 60
+        self._updated = now
+        if self.rpm:
+            refill = elapsed_minutes * self.rpm
+            self._requests = min(self.rpm, self._requests + refill)
+        if self.tpm:
+            refill = elapsed_minutes * self.tpm
+            self._tokens = min(self.tpm, self._tokens + refill)
+
+    def acquire(self, requests=1, tokens=0):
+        # Una richiesta più grande del bucket passa quando il bucket è pieno
+        if self.rpm:
+            requests = min(requests, self.rpm)
+        if self.tpm:
+            tokens = min(tokens, self.tpm)
+        while True:
+            with self._lock:
+                self._refill()
+                ok_requests = not self.rpm or self._requests >= requests
+                ok_tokens = not self.tpm or self._tokens >= tokens
+                if ok_requests and ok_tokens:
+                    if self.rpm:
+                        self._requests -= requests
+                    if self.tpm:
+                        self._tokens -= tokens
+                    return
+                wait = 0.0
+                if not ok_requests:
+                    wait = max(wait, (requests - self._requests) / self.rpm * 60)
+                if not ok_tokens:
+                    wait = max(wait, (tokens - self._tokens) / self.tpm * 60)
+            time.sleep(min(wait, 5.0))
+
+    def settle(self, reserved, used):
+        """
+        Corregge la quota token con l'uso reale riportato dall'API: la
+        differenza rispetto alla stima viene addebitata (il bucket può andare
+        sotto zero e le acquire() successive attendono) o rimborsata.
+        """
+        if not self.tpm:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.tpm, self._tokens + reserved - used)
+
+
+def load_manifest(path):
+    """
+    Legge il manifest (JSONL o CSV). Campi per riga:
+    id, cv_path oppure cv_text, personality_text, github_user, web_links.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    for index, row in enumerate(rows):
+        row.setdefault("id", str(index))
+        row["id"] = str(row["id"])
+        if row.get("cv_path") and not os.path.isabs(row["cv_path"]):
+            row["cv_path"] = os.path.join(base_dir, row["cv_path"])
+    return rows
+
+
+def load_checkpoint(output_path, retry_errors=False):
+    """
+    Il file di output JSONL fa da checkpoint: gli id già scritti vengono saltati.
+    Righe troncate (crash a metà scrittura, anche dentro un carattere UTF-8)
+    vengono ignorate.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb") as f:
+        for line in f:
+            try:
+                # Byte grezzi: UnicodeDecodeError e JSONDecodeError sono ValueError
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            if record.get("status") == "ok" or not retry_errors:
+                done.add(str(record.get("id")))
+    return done
+
+
+def _ends_with_newline(path):
+    # Ultimo byte in binario: la riga troncata può finire a metà di un carattere
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def read_cv(row):
+    """
+    Testo del CV della riga. Solleva ValueError se è vuoto o se l'estrazione
+    del PDF è fallita (utils.extract_text_from_pdf restituisce "Errore ..."
+    invece di sollevare): la riga va in errore prima di quota e LLM.
+    """
+    if row.get("cv_text"):
+        cv_text = row["cv_text"]
+    elif row["cv_path"].lower().endswith(".pdf"):
+        with open(row["cv_path"], "rb") as f:
+            cv_text = utils.extract_text_from_pdf(f)
+    else:
+        with open(row["cv_path"], encoding="utf-8") as f:
+            cv_text = f.read()
+    if cv_text.startswith("Errore"):
+        raise ValueError(cv_text)
+    if not cv_text.strip():
+        raise ValueError("CV vuoto")
+    return cv_text
+
+
+def estimate_tokens(cv_text, personality_text, combined=False):
+    """
+    Token stimati per le chiamate LLM di un'analisi (input + output).
+    GitHub e web non sono ancora scaricati: il prompt delle traiettorie viene
+    stimato al budget intero di context_packer, più il system prompt.
+    L'archetipo riceve CV e personalità non compattati.
+    """
+    count = context_packer.count_tokens
+    system_prompt = engine.COMBINED_SYSTEM_PROMPT if combined else engine.SYSTEM_PROMPT
+    tokens = (
+        count(system_prompt)
+        + count(engine.build_user_prompt("", ""))
+        + context_packer.get_token_budget(TRAJECTORY_MODEL)
+    )
+    if not combined:
+        tokens += count(logic.SYSTEM_PROMPT) + count(personality_text + " " + cv_text)
+    return tokens + ESTIMATED_OUTPUT_TOKENS
+
+
+def run_job(row, limiter, combined=False):
+    """
+    Esegue arricchimento + LLM per una riga del manifest.
+    """
+    start = time.perf_counter()
+    cv_text = read_cv(row)
+    personality_text = row.get("personality_text", "")
+
+    # Quota: richieste LLM della pipeline e token stimati, poi corretti con l'uso
+    # reale (token sommati sullo span del job dagli span LLM figli)
+    llm_requests = 1 if combined else 2
+    reserved = estimate_tokens(cv_text, personality_text, combined)
+    limiter.acquire(requests=llm_requests, tokens=reserved)
+
+    results = {}
+    timings = {}
+    with telemetry.span("batch.job", id=row["id"]) as job:
+        try:
+            for stage in pipeline.run_analysis(
+                cv_text,
+                personality_text,
+                row.get("github_user", ""),
+                row.get("web_links", ""),
+                stream=False,
+                combined=combined,
+            ):
+                results[stage.name] = stage.result
+                timings[stage.name] = round(stage.elapsed, 3)
+        finally:
+            used = job.attributes.get("prompt_tokens", 0) + job.attributes.get(
+                "completion_tokens", 0
+            )
+            limiter.settle(reserved, used)
+
+    cts_analysis = results.get("trajectory")
+    archetype = results.get("archetype") or {}
+    ok = cts_analysis is not None and "error" not in archetype
+    return {
+        "id": row["id"],
+        "status": "ok" if ok else "error",
+        "archetype": archetype,
+        "trajectories": cts_analysis.model_dump() if cts_analysis else None,
+        "timings": timings,
+        "tokens": used,
+        "elapsed": round(time.perf_counter() - start, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Analisi batch (headless) di un manifest di CV."
+    )
+    parser.add_argument("manifest", help="Manifest JSONL o CSV")
+    parser.add_argument("-o", "--output", required=True, help="Risultati JSONL")
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=4, help="Analisi in parallelo"
+    )
+    parser.add_argument("--rpm", type=int, default=60, help="Richieste LLM/minuto")
+    parser.add_argument("--tpm", type=int, default=200000, help="Token LLM/minuto")
+    parser.add_argument(
+        "--combined", action="store_true", help="Una sola chiamata LLM per CV"
+    )
+    parser.add_argument(
+        "--retry-errors", action="store_true", help="Ripete le righe in errore"
+    )
+    args = parser.parse_args(argv)
+
+    rows = load_manifest(args.manifest)
+    done = load_checkpoint(args.output, args.retry_errors)
+    todo = [row for row in rows if row["id"] not in done]
+    print(
+        f"[BATCH] {len(rows)} righe nel manifest, {len(done)} già completate, "
+        f"{len(todo)} da eseguire",
+        file=sys.stderr,
+    )
+
+    limiter = RateLimiter(args.rpm, args.tpm)
+    write_lock = threading.Lock()
+    counters = {"ok": 0, "error": 0}
+    start = time.perf_counter()
+
+    def process(row):
+        try:
+            record = run_job(row, limiter, args.combined)
+        except Exception as e:
+            record = {"id": row["id"], "status": "error", "error": str(e)}
+        with write_lock:
+            # Scrittura incrementale: ogni riga è anche il checkpoint
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            counters[record["status"]] += 1
+            completed = counters["ok"] + counters["error"]
+            elapsed = time.perf_counter() - start
+            print(
+                f"[BATCH] {completed}/{len(todo)} ({counters['error']} errori) "
+                f"{completed / elapsed * 60:.1f} CV/min",
+                file=sys.stderr,
+            )
+
+    # Dopo un crash l'ultima riga può essere troncata: ripartiamo a capo
+    missing_newline = os.path.exists(args.output) and not _ends_with_newline(
+        args.output
+    )
+    with open(args.output, "a", encoding="utf-8") as out:
+        if missing_newline:
+            out.write("\n")
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(process, todo))
+
+    elapsed = time.perf_counter() - start
+    rate = len(todo) / elapsed * 60 if elapsed > 0 else 0.0
+    print(
+        f"[BATCH] Completato: {counters['ok']} ok, {counters['error']} errori "
+        f"in {elapsed:.1f}s = {rate:.1f} CV/min",
+        file=sys.stderr,
+    )
+    return 1 if counters["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
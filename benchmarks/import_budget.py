@@ -0,0 +1,184 @@
+"""
+Budget del tempo di import (python -X importtime) per l'avvio a freddo.
+Dalla root del repo:
+
+    python -m benchmarks.import_budget              # confronto con il budget
+    python -m benchmarks.import_budget --update     # riscrive il budget
+
+Segnala una regressione se un target supera il budget oltre la tolleranza,
+oppure se importa una dipendenza pesante che deve restare lazy.
+"""
+
+import argparse
+import ast
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(ROOT, "benchmarks", "import_budget.json")
+APP_PATH = os.path.join(ROOT, "app.py")
+
+# Per la landing Streamlit è già caricato dal processo: escluso dal conteggio
+LANDING_PRELOADED = ("streamlit",)
+
+# Dipendenze pesanti che i target non devono importare a livello di modulo
+LAZY_DEPENDENCIES = {
+    "app (landing)": ("openai", "pydantic", "fitz", "requests"),
+    "telemetry": ("openai", "pydantic", "fitz", "requests"),
+    "job_store": ("openai", "pydantic", "fitz", "requests"),
+    "llm_client": ("openai", "streamlit"),
+    "llm_resilience": ("openai", "streamlit"),
+    "utils": ("openai", "fitz", "numpy"),
+    "engine": ("openai", "fitz", "numpy"),
+    "logic": ("openai", "fitz"),
+    "pipeline": ("openai", "fitz", "numpy"),
+}
+
+# Sotto questa differenza assoluta (ms) il tempo di import è rumore
+MIN_ABSOLUTE_DELTA_MS = 10.0
+
+
+def landing_imports():
+    """
+    Moduli importati da app.py a livello di modulo, cioè prima che la landing
+    (step 0) venga disegnata. Gli import dentro gli if (step 1) non contano.
+    """
+    with open(APP_PATH, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return [
+        module
+        for module in modules
+        if module.split(".")[0] not in LANDING_PRELOADED
+    ]
+
+
+def targets():
+    # Nome -> (moduli già caricati, moduli misurati)
+    result = {"app (landing)": (LANDING_PRELOADED, landing_imports())}
+    for module in LAZY_DEPENDENCIES:
+        result.setdefault(module, ((), [module]))
+    return result
+
+
+def measure_once(preloaded, modules):
+    """
+    Un interprete nuovo: restituisce (ms cumulativi dei moduli, moduli importati).
+    I moduli in `preloaded` vengono importati prima e non contano.
+    """
+    code = "; ".join(f"import {module}" for module in (*preloaded, *modules))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Import fallito ({modules}):\n{completed.stderr}")
+
+    total_us = 0
+    imported = set()
+    preloading = set(preloaded)
+    counting = not preloading
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Intestazione
+        top_level = not name.startswith("  ")
+        name = name.strip()
+        if top_level and name in preloading:
+            preloading.discard(name)
+            counting = not preloading
+            continue
+        if counting:
+            imported.add(name)
+            if top_level:
+                total_us += int(cumulative)
+    return total_us / 1000, imported
+
+
+def measure(preloaded, modules, repeat):
+    # Il primo giro scalda la cache del filesystem e viene scartato
+    measure_once(preloaded, modules)
+    samples = []
+    imported = set()
+    for _ in range(repeat):
+        elapsed, imported = measure_once(preloaded, modules)
+        samples.append(elapsed)
+    return statistics.median(samples), imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Budget del tempo di import.")
+    parser.add_argument("-n", "--repeat", type=int, default=5)
+    parser.add_argument(
+        "--threshold", type=float, default=0.3, help="Tolleranza (0.3 = +30%%)"
+    )
+    parser.add_argument(
+        "--update", action="store_true", help="Salva le misure come nuovo budget"
+    )
+    args = parser.parse_args(argv)
+
+    budgets = {}
+    if os.path.exists(BUDGET_PATH) and not args.update:
+        with open(BUDGET_PATH, encoding="utf-8") as f:
+            budgets = json.load(f)["budgets_ms"]
+
+    measured = {}
+    failures = []
+    for name, (preloaded, modules) in targets().items():
+        elapsed, imported = measure(preloaded, modules, args.repeat)
+        measured[name] = round(elapsed, 1)
+        eager = [dep for dep in LAZY_DEPENDENCIES.get(name, ()) if dep in imported]
+        budget = budgets.get(name)
+
+        flag = "ok"
+        if eager:
+            flag = f"IMPORT EAGER: {', '.join(eager)}"
+        elif budget is not None and (
+            elapsed > budget * (1 + args.threshold)
+            and elapsed - budget > MIN_ABSOLUTE_DELTA_MS
+        ):
+            flag = "REGRESSIONE"
+        if flag != "ok":
+            failures.append(name)
+
+        budget_text = f"{budget:8.1f}ms" if budget is not None else "       -  "
+        print(f"{name:18s} {elapsed:8.1f}ms  budget {budget_text}  {flag}")
+
+    if args.update:
+        with open(BUDGET_PATH, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "meta": {
+                        "python": platform.python_version(),
+                        "platform": platform.platform(),
+                        "landing_preloaded": list(LANDING_PRELOADED),
+                    },
+                    "budgets_ms": measured,
+                },
+                f,
+                indent=2,
+            )
+        print(f"[IMPORT BUDGET] Budget salvato in {BUDGET_PATH}")
+
+    if failures:
+        print(f"[IMPORT BUDGET] {len(failures)} problemi: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
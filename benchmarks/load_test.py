@@ -0,0 +1,311 @@
+"""
+Load test multi-sessione di app.py: N sessioni simulate (streamlit.testing
+AppTest, una per thread) percorrono insieme landing -> step 1 -> analisi
+contro i server finti di stub_servers.py. Dalla root del repo:
+
+    python -m benchmarks.load_test --sessions 1,2,4,8,16
+    python -m benchmarks.load_test --sessions 4,8 -o benchmarks/load.json
+
+Per ogni livello di concorrenza riporta p50/p95/p99 dei passi dell'interfaccia
+e degli stadi della pipeline (span di telemetry.py), il throughput di analisi
+completate e la crescita della RSS del processo per sessione.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.run_benchmarks import (
+    CV_TEXT,
+    configure,
+    percentile,
+    reset_http_cache,
+)
+from benchmarks.stub_servers import StubConfig, StubServers
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+# Secrets di ogni sessione simulata: niente endpoint metriche né warm-up di rete
+APP_SECRETS = {
+    "OPENROUTER_API_KEY": "stub-key",
+    "METRICS_PORT": 0,
+    "OPENROUTER_WARMUP": False,
+}
+# Passi dell'interfaccia misurati dal driver
+UI_STEPS = ("landing", "start", "analyze")
+# Span di telemetry.py riportati come stadi della pipeline
+STAGE_SPANS = (
+    "validate_links",
+    "analysis",
+    "github",
+    "web",
+    "llm.archetype",
+    "llm.trajectory_stream",
+    "llm.combined",
+)
+SESSION_TIMEOUT = 120  # Secondi massimi per un singolo rerun dell'app
+
+
+def rss_bytes():
+    """
+    RSS attuale del processo (Linux: /proc), altrimenti il picco da getrusage.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def latency_summary(samples):
+    if not samples:
+        return None
+    return {
+        "n": len(samples),
+        "p50": percentile(samples, 0.50),
+        "p95": percentile(samples, 0.95),
+        "p99": percentile(samples, 0.99),
+        "max": max(samples),
+    }
+
+
+def widget(widgets, label):
+    return next(item for item in widgets if item.label == label)
+
+
+def session_inputs(label, index, shared):
+    """
+    Input della sessione. Di default unici per sessione e livello: job store,
+    cache e single-flight non possono riusare il lavoro di altre sessioni.
+    Con shared=True tutte le sessioni inviano lo stesso profilo (una classe).
+    """
+    tag = "shared" if shared else f"{label}-s{index}"
+    return {
+        "cv": CV_TEXT + f"\nRiferimento candidatura: {tag}\n",
+        "github": f"user-{tag}",
+        "personality": f"Curioso ({tag})",
+    }
+
+
+def run_session(label, index, stubs, barrier, shared, timeout):
+    """
+    Una sessione: landing, "SCOPRI CHI SARAI", compilazione, analisi completa.
+    Restituisce (AppTest, tempi dei passi, esito). L'AppTest resta vivo fino
+    alla misura della RSS, come una sessione aperta nel browser.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    inputs = session_inputs(label, index, shared)
+    app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    app.secrets.update(APP_SECRETS)
+    timings = {}
+    barrier.wait()
+
+    start = time.perf_counter()
+    app.run()
+    timings["landing"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    widget(app.button, "SCOPRI CHI SARAI").click().run()
+    timings["start"] = time.perf_counter() - start
+
+    app.text_area[0].input(inputs["cv"])
+    widget(app.text_input, "GitHub Username").input(inputs["github"])
+    widget(app.text_input, "Web / Behance / Portfolio").input(
+        f"{stubs.urls['site']}/{inputs['github']}"
+    )
+    widget(app.text_input, "Personalità").input(inputs["personality"])
+
+    start = time.perf_counter()
+    widget(app.button, "PROCEDI ALL'ANALISI").click().run()
+    timings["analyze"] = time.perf_counter() - start
+
+    completed = any("Simulazione Completata" in item.value for item in app.success)
+    ok = completed and not app.exception
+    return app, timings, ok
+
+
+def read_spans(path):
+    spans = {}
+    if not os.path.exists(path):
+        return spans
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            spans.setdefault(record["name"], []).append(record["duration_ms"] / 1000)
+    return spans
+
+
+def run_level(level, stubs, workdir, shared, timeout, label=None):
+    """
+    `level` sessioni in parallelo (partenza sincronizzata da una barriera).
+    """
+    import telemetry
+
+    # Cache vuote: ogni livello paga fetch e chiamate LLM come un avvio reale
+    reset_http_cache(workdir)
+    label = label or f"n{level}"
+    span_log = os.path.join(workdir, f"spans-{label}.jsonl")
+    telemetry.TELEMETRY_LOG = span_log
+    telemetry._log_file = None
+
+    gc.collect()
+    rss_before = rss_bytes()
+    barrier = threading.Barrier(level)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=level) as executor:
+        futures = [
+            executor.submit(run_session, label, i, stubs, barrier, shared, timeout)
+            for i in range(level)
+        ]
+        sessions = []
+        errors = []
+        for future in futures:
+            try:
+                sessions.append(future.result())
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+    wall = time.perf_counter() - start
+    gc.collect()
+    rss_after = rss_bytes()
+
+    if telemetry._log_file is not None:
+        telemetry._log_file.close()
+        telemetry._log_file = None
+    telemetry.TELEMETRY_LOG = "off"
+    spans = read_spans(span_log)
+
+    completed = sum(ok for _, _, ok in sessions)
+    report = {
+        "sessions": level,
+        "completed": completed,
+        "failed": level - completed,
+        "errors": errors,
+        "wall_seconds": wall,
+        "throughput_per_minute": completed / wall * 60 if wall else 0.0,
+        "rss_before_mb": rss_before / 2**20,
+        "rss_after_mb": rss_after / 2**20,
+        "rss_per_session_mb": (rss_after - rss_before) / level / 2**20,
+        "ui": {
+            step: latency_summary([timings[step] for _, timings, _ in sessions])
+            for step in UI_STEPS
+        },
+        "stages": {
+            name: latency_summary(spans[name]) for name in STAGE_SPANS if name in spans
+        },
+    }
+    # Le sessioni vengono chiuse solo dopo la misura della RSS
+    del sessions
+    gc.collect()
+    return report
+
+
+def print_level(report):
+    print(
+        f"\n[LOAD] {report['sessions']} sessioni: {report['completed']} complete, "
+        f"{report['failed']} fallite in {report['wall_seconds']:.1f}s "
+        f"({report['throughput_per_minute']:.1f} analisi/min), "
+        f"RSS {report['rss_after_mb']:.0f} MB "
+        f"(+{report['rss_per_session_mb']:.1f} MB/sessione)"
+    )
+    rows = [(f"ui.{name}", stats) for name, stats in report["ui"].items()]
+    rows += list(report["stages"].items())
+    for name, stats in rows:
+        if stats is None:
+            continue
+        print(
+            f"  {name:26s} p50 {stats['p50'] * 1000:9.1f}ms  "
+            f"p95 {stats['p95'] * 1000:9.1f}ms  p99 {stats['p99'] * 1000:9.1f}ms"
+        )
+    for error in report["errors"]:
+        print(f"  ERRORE: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test multi-sessione di app.py.")
+    parser.add_argument(
+        "--sessions", default="1,2,4,8", help="Livelli di concorrenza (es. 1,4,16)"
+    )
+    parser.add_argument("-o", "--output", help="Salva il report (JSON)")
+    parser.add_argument(
+        "--shared-inputs",
+        action="store_true",
+        help="Stesso profilo per tutte le sessioni (dedup di job e fetch)",
+    )
+    parser.add_argument(
+        "--semantic-cache",
+        action="store_true",
+        help="Lascia attiva la cache semantica (i CV simulati sono quasi uguali)",
+    )
+    parser.add_argument("--timeout", type=float, default=SESSION_TIMEOUT)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--github-latency", type=float, default=0.05)
+    parser.add_argument("--site-latency", type=float, default=0.05)
+    args = parser.parse_args(argv)
+    levels = [int(value) for value in args.sessions.split(",") if value.strip()]
+
+    # app.py legge CSS e video con percorsi relativi alla root
+    os.chdir(ROOT)
+    if not args.semantic_cache:
+        os.environ["SEMANTIC_CACHE_THRESHOLD"] = "2"
+
+    import streamlit as st
+    from streamlit.runtime.secrets import Secrets
+
+    import job_store
+
+    # AppTest sostituisce st.secrets durante ogni run e poi ripristina il
+    # precedente: con sessioni in parallelo anche quello deve avere la chiave
+    secrets = Secrets()
+    secrets._secrets = dict(APP_SECRETS)
+    st.secrets = secrets
+
+    config = StubConfig(
+        llm_latency=args.llm_latency,
+        github_latency=args.github_latency,
+        site_latency=args.site_latency,
+    )
+    reports = []
+    with tempfile.TemporaryDirectory() as workdir, StubServers(config) as stubs:
+        configure(stubs, workdir)
+        # Una sessione di riscaldamento: import e risorse di processo
+        # (cache_resource, pool) non finiscono nella RSS del primo livello
+        run_level(1, stubs, workdir, False, args.timeout, label="warmup")
+        for level in levels:
+            report = run_level(level, stubs, workdir, args.shared_inputs, args.timeout)
+            print_level(report)
+            reports.append(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "meta": {
+                        "python": platform.python_version(),
+                        "platform": platform.platform(),
+                        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "job_max_workers": job_store.JOB_MAX_WORKERS,
+                        "shared_inputs": args.shared_inputs,
+                        "stub_config": vars(config),
+                    },
+                    "levels": reports,
+                },
+                f,
+                indent=2,
+            )
+        print(f"[LOAD] Report salvato in {args.output}")
+    return 1 if any(report["failed"] for report in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
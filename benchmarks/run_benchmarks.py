@@ -0,0 +1,333 @@
+"""
+Benchmark offline della pipeline con server locali al posto di OpenRouter,
+GitHub e r.jina.ai. Dalla root del repo:
+
+    python -m benchmarks.run_benchmarks -o benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+# La chiave finta deve esserci prima che llm_client crei il client
+os.environ.setdefault("OPENROUTER_API_KEY", "stub-key")
+# Niente log JSON degli span durante le misure (TELEMETRY_LOG=stderr per vederli)
+os.environ.setdefault("TELEMETRY_LOG", "off")
+
+import fitz  # noqa: E402  PyMuPDF
+
+import engine  # noqa: E402
+import github_profile  # noqa: E402
+import http_cache  # noqa: E402
+import llm_cache  # noqa: E402
+import llm_client  # noqa: E402
+import logic  # noqa: E402
+import utils  # noqa: E402
+from benchmarks.stub_servers import (  # noqa: E402
+    StubConfig,
+    StubServers,
+    github_languages,
+    github_repo_page,
+    site_page,
+)
+
+CV_TEXT = (
+    "Profilo\nDesigner e sviluppatore Python con 6 anni di esperienza.\n"
+    "Esperienza\nFrontend developer presso Studio X (2019-2024).\n"
+    "Competenze\nPython, Figma, React, Data Visualization.\n"
+)
+PERSONALITY_TEXT = "Personalità: Curioso\nSogni: Startup su Marte\nObbiettivi: CPO"
+WEB_LINKS = "portfolio.example.com, behance.example.com/user, blog.example.com"
+
+# Sotto questa differenza assoluta (secondi) il p50 è rumore, non regressione
+MIN_ABSOLUTE_DELTA = 0.002
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        "n": len(samples),
+        "mean": sum(samples) / len(samples),
+        "p50": percentile(samples, 0.50),
+        "p95": percentile(samples, 0.95),
+        "min": min(samples),
+        "max": max(samples),
+    }
+
+
+def bench(func, iterations, setup=None):
+    samples = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+        # Gli errori vengono restituiti, non sollevati: un errore veloce
+        # falserebbe il benchmark
+        if (
+            result is None
+            or (isinstance(result, dict) and "error" in result)
+            or (isinstance(result, str) and result.startswith("Errore"))
+        ):
+            raise RuntimeError(f"Risultato non valido durante il benchmark: {result}")
+    return summarize(samples)
+
+
+def make_pdf(pages):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((50, 72), CV_TEXT + f"Pagina {i}\n" * 20, fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def configure(stubs, workdir):
+    """
+    Punta i moduli ai server finti e isola le cache in una cartella temporanea.
+    """
+    urls = stubs.urls
+    utils.GITHUB_API_URL = urls["github_api"]
+    utils.GITHUB_RAW_URL = urls["github_raw"]
+    utils.GITHUB_GRAPHQL_URL = urls["github_api"] + "/graphql"
+    utils.JINA_READER_URL = urls["jina"]
+    llm_client.OPENROUTER_BASE_URL = urls["openai"]
+    # GitHub in modalità REST e pagine via jina, salvo dove il benchmark cambia modo
+    os.environ.pop("GITHUB_TOKEN", None)
+    os.environ.pop("GITHUB_DEEP_PROFILE", None)
+    os.environ.pop("WEB_EXTRACTOR", None)
+    llm_client._client = None
+    llm_cache._cache = llm_cache.LLMCache(path=os.path.join(workdir, "llm.sqlite"))
+    reset_http_cache(workdir)
+
+
+def reset_http_cache(workdir):
+    # Cache HTTP vuota: ogni iterazione "cold" scarica tutto dai server finti
+    path = os.path.join(workdir, f"http-{time.perf_counter_ns()}.sqlite")
+    http_cache._cache = http_cache.HTTPCache(path=path)
+
+
+def run_suite(iterations, config):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir, StubServers(config) as stubs:
+        configure(stubs, workdir)
+
+        # --- PDF ---
+        for pages in (2, 60):
+            data = make_pdf(pages)
+            results[f"extract_text_from_pdf[{pages}p,cold]"] = bench(
+                lambda: utils.extract_text_from_pdf(io.BytesIO(data)),
+                iterations,
+                setup=utils._pdf_cache.clear,
+            )
+            results[f"extract_text_from_pdf[{pages}p,warm]"] = bench(
+                lambda: utils.extract_text_from_pdf(io.BytesIO(data)), iterations
+            )
+
+        # --- ARRICCHIMENTO ---
+        results["get_github_dna[cold]"] = bench(
+            lambda: utils.get_github_dna("bench-user"),
+            iterations,
+            setup=lambda: reset_http_cache(workdir),
+        )
+        results["get_github_dna[warm]"] = bench(
+            lambda: utils.get_github_dna("bench-user"), iterations
+        )
+        # Modalità GraphQL: una richiesta per profilo (serve un GITHUB_TOKEN)
+        os.environ["GITHUB_TOKEN"] = "stub-token"
+        results["get_github_dna[graphql,cold]"] = bench(
+            lambda: utils.get_github_dna("bench-user"),
+            iterations,
+            setup=utils._github_graphql_cache.clear,
+        )
+        # Profilo completo: tutte le pagine di repo e i linguaggi in parallelo
+        def cold_github():
+            reset_http_cache(workdir)
+            utils._github_graphql_cache.clear()
+
+        os.environ["GITHUB_DEEP_PROFILE"] = "1"
+        results["get_github_dna[deep,graphql,cold]"] = bench(
+            lambda: utils.get_github_dna("bench-user"), iterations, setup=cold_github
+        )
+        del os.environ["GITHUB_DEEP_PROFILE"]
+        del os.environ["GITHUB_TOKEN"]
+        profile_repos, _ = github_repo_page(
+            StubConfig(github_public_repos=1000), "", "", {"per_page": ["1000"]}
+        )
+        profile_languages = {
+            repo["name"]: github_languages(repo["name"]) for repo in profile_repos
+        }
+        results["build_profile[1000 repos]"] = bench(
+            lambda: github_profile.build_profile(profile_repos, profile_languages),
+            iterations,
+        )
+
+        results["get_web_dna[cold]"] = bench(
+            lambda: utils.get_web_dna(WEB_LINKS),
+            iterations,
+            setup=lambda: reset_http_cache(workdir),
+        )
+        results["get_web_dna[warm]"] = bench(
+            lambda: utils.get_web_dna(WEB_LINKS), iterations
+        )
+        # Estrazione locale: pagine HTML scaricate dai "siti" e convertite qui
+        site_links = ", ".join(
+            f"{stubs.urls['site']}/{name}" for name in ("portfolio", "behance", "blog")
+        )
+        os.environ["WEB_EXTRACTOR"] = "local"
+        results["get_web_dna[local,cold]"] = bench(
+            lambda: utils.get_web_dna(site_links),
+            iterations,
+            setup=lambda: reset_http_cache(workdir),
+        )
+        del os.environ["WEB_EXTRACTOR"]
+        page = site_page(config, "portfolio")
+        results["html_to_text[page]"] = bench(
+            lambda: utils._html_to_text(page), iterations
+        )
+        large_page = site_page(StubConfig(page_size=200_000), "portfolio")
+        results["html_to_text[200k]"] = bench(
+            lambda: utils._html_to_text(large_page), iterations
+        )
+
+        # --- LLM (cache LLM disattivata) ---
+        github_data = utils.get_github_dna("bench-user")
+        web_data = utils.get_web_dna(WEB_LINKS)
+        results["get_archetype_analysis"] = bench(
+            lambda: logic.get_archetype_analysis(
+                PERSONALITY_TEXT + " " + CV_TEXT, use_cache=False
+            ),
+            iterations,
+        )
+        results["generate_trajectory_simulation"] = bench(
+            lambda: engine.generate_trajectory_simulation(
+                CV_TEXT, PERSONALITY_TEXT, github_data, web_data, use_cache=False
+            ),
+            iterations,
+        )
+
+        # Streaming: tempo al primo contenuto e tempo totale
+        first_content = []
+        total = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            first = None
+            for field, _value in engine.stream_trajectory_simulation(
+                CV_TEXT, PERSONALITY_TEXT, github_data, web_data, use_cache=False
+            ):
+                if first is None and field != "complete":
+                    first = time.perf_counter() - start
+            total.append(time.perf_counter() - start)
+            first_content.append(first if first is not None else total[-1])
+        results["stream_trajectory_simulation[first_content]"] = summarize(
+            first_content
+        )
+        results["stream_trajectory_simulation[total]"] = summarize(total)
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Confronta i p50 con la baseline: regressione se più lento di `threshold`.
+    """
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            # Benchmark nuovo: va aggiunto alla baseline (-o) per essere controllato
+            print(f"  {name:48s} assente dalla baseline, non confrontato")
+            continue
+        ratio = stats["p50"] / base["p50"] if base["p50"] > 0 else 1.0
+        regressed = (
+            ratio > 1 + threshold
+            and stats["p50"] - base["p50"] > MIN_ABSOLUTE_DELTA
+        )
+        flag = "REGRESSIONE" if regressed else "ok"
+        print(
+            f"  {name:48s} {base['p50'] * 1000:9.2f}ms -> "
+            f"{stats['p50'] * 1000:9.2f}ms ({ratio:5.2f}x) {flag}"
+        )
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline della pipeline.")
+    parser.add_argument("-n", "--iterations", type=int, default=10)
+    parser.add_argument("-o", "--output", help="Salva i risultati (JSON baseline)")
+    parser.add_argument("--baseline", help="Baseline JSON da confrontare")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Tolleranza sul p50 (0.2 = +20%%)"
+    )
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument(
+        "--llm-error-rate", type=float, default=0.0, help="Quota di 503 dal finto LLM"
+    )
+    parser.add_argument("--github-latency", type=float, default=0.05)
+    parser.add_argument("--jina-latency", type=float, default=0.1)
+    parser.add_argument("--site-latency", type=float, default=0.05)
+    parser.add_argument("--payload-scale", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    scale = args.payload_scale
+    config = StubConfig(
+        llm_latency=args.llm_latency,
+        llm_error_rate=args.llm_error_rate,
+        github_latency=args.github_latency,
+        jina_latency=args.jina_latency,
+        site_latency=args.site_latency,
+        llm_text_size=int(400 * scale),
+        readme_size=int(3000 * scale),
+        page_size=int(6000 * scale),
+    )
+    results = run_suite(args.iterations, config)
+
+    for name, stats in results.items():
+        print(
+            f"{name:48s} p50 {stats['p50'] * 1000:9.2f}ms  "
+            f"p95 {stats['p95'] * 1000:9.2f}ms  mean {stats['mean'] * 1000:9.2f}ms"
+        )
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "iterations": args.iterations,
+            "stub_config": vars(config),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[BENCH] Risultati salvati in {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"[BENCH] Confronto con {args.baseline}:")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"[BENCH] {len(regressions)} regressioni: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# --- SERVER LOCALI SOSTITUTIVI ---
+# Un solo server HTTP con cinque prefissi:
+#   /openai/...      API compatibile OpenAI (chat completions, anche streaming)
+#   /github-api/...  GitHub REST (lista repo paginata, linguaggi) e GraphQL
+#                    (POST /github-api/graphql)
+#   /github-raw/...  raw.githubusercontent.com (README)
+#   /jina/...        r.jina.ai (pagine web già in testo)
+#   /site/...        siti dei portfolio in HTML (estrazione locale)
+
+
+class StubConfig:
+    """
+    Parametri dei server finti: latenze (secondi) e dimensioni dei payload.
+    """
+
+    def __init__(
+        self,
+        llm_latency=0.3,
+        llm_chunk_delay=0.002,
+        llm_text_size=400,
+        llm_error_rate=0.0,
+        github_latency=0.05,
+        github_repos=5,
+        github_public_repos=250,
+        readme_size=3000,
+        jina_latency=0.1,
+        site_latency=0.05,
+        page_size=6000,
+    ):
+        self.llm_latency = llm_latency
+        self.llm_chunk_delay = llm_chunk_delay
+        self.llm_text_size = llm_text_size
+        self.llm_error_rate = llm_error_rate  # Quota di 503 (prova retry/fallback)
+        self.github_latency = github_latency
+        self.github_repos = github_repos
+        # Repo pubbliche dell'account: pagine e linguaggi del profilo completo
+        self.github_public_repos = max(github_public_repos, github_repos)
+        self.readme_size = readme_size
+        self.jina_latency = jina_latency
+        self.site_latency = site_latency  # Sito originale, senza il hop del proxy
+        self.page_size = page_size
+
+
+# Budget GitHub sempre pieno: i benchmark non devono mai ripiegare
+RATE_LIMIT_HEADERS = {"X-RateLimit-Remaining": "4999", "X-RateLimit-Reset": "0"}
+
+
+def _filler(size, seed="lorem"):
+    words = f"{seed} ipsum dolor sit amet consectetur "
+    return (words * (size // len(words) + 1))[:size]
+
+
+def _trajectory(config, probability):
+    return {
+        "title": "Neural Interface Strategist",
+        "probability": probability,
+        "description": _filler(config.llm_text_size, "trajectory"),
+        "hypothetical_project": _filler(config.llm_text_size // 2, "project"),
+    }
+
+
+def _archetype(config):
+    return {
+        "archetype_title": "Full-Stack Visionary",
+        "archetype_category": "TECH",
+        "power_color": "#00FF00",
+        "analysis_summary": _filler(config.llm_text_size // 2, "analisi"),
+        "future_prediction": _filler(config.llm_text_size // 2, "futuro"),
+        "key_skills": ["Python", "Design", "Strategy"],
+    }
+
+
+def llm_payload(config, request):
+    """
+    Contenuto della risposta in base allo schema richiesto (response_format).
+    """
+    schema_name = (
+        (request.get("response_format") or {}).get("json_schema", {}).get("name", "")
+    )
+    if schema_name in ("CTSAnalysis", "CombinedAnalysis"):
+        payload = {
+            "core_vector": _filler(config.llm_text_size // 4, "vector"),
+            "trajectory_1_strategic": _trajectory(config, "High"),
+            "trajectory_2_challenge": _trajectory(config, "Medium"),
+            "trajectory_3_visionary": _trajectory(config, "Low"),
+        }
+        if schema_name == "CombinedAnalysis":
+            payload["archetype"] = _archetype(config)
+        return payload
+    return _archetype(config)
+
+
+def site_page(config, name):
+    """
+    Pagina HTML realistica: head con script e stili, menu, banner cookie,
+    contenuto principale di circa page_size caratteri e footer.
+    """
+    sections = []
+    for i in range(max(1, config.page_size // 600)):
+        sections.append(
+            f"<section><h2>Progetto {i}</h2><p>{_filler(500, 'page')}</p>"
+            f'<ul><li><a href="/p/{i}">Case study</a></li><li>Figma, Python</li></ul>'
+            "</section>"
+        )
+    return (
+        "<!doctype html><html><head>"
+        f"<title>{name} | Portfolio</title>"
+        "<style>body{font-family:sans-serif}.nav a{margin:4px}</style>"
+        "<script>window.dataLayer=[];function track(){return '<p>no</p>'}</script>"
+        "</head><body>"
+        '<nav class="nav"><a href="/">Home</a><a href="/work">Work</a>'
+        '<a href="/about">About</a></nav>'
+        '<div class="cookie-banner">Usiamo i cookie. <button>Accetta</button></div>'
+        f"<main><h1>{name}</h1>{''.join(sections)}</main>"
+        "<footer>&copy; 2024 Portfolio &middot; Privacy</footer>"
+        "</body></html>"
+    )
+
+
+def github_repo_page(config, base_url, path, query):
+    """
+    Una pagina della lista REST delle repo, con header Link come la API reale.
+    """
+    per_page = int(query.get("per_page", ["30"])[0])
+    page = int(query.get("page", ["1"])[0])
+    total = config.github_public_repos
+    first = (page - 1) * per_page
+    repos = [
+        {
+            "name": f"repo-{i}",
+            "description": f"Progetto di test {i}",
+            "language": ("Python", "TypeScript", "Go", None)[i % 4],
+            "size": 200 + i * 7,
+            "stargazers_count": (i * 37) % 50,
+            "fork": i % 5 == 4,
+            "archived": i % 11 == 10,
+            "created_at": f"{2015 + i % 10}-03-01T10:00:00Z",
+            "pushed_at": f"{2025 - i % 6}-0{1 + i % 9}-15T10:00:00Z",
+        }
+        for i in range(first, min(first + per_page, total))
+    ]
+    last = max(1, -(-total // per_page))
+    links = [
+        f'<{base_url}{path}?per_page={per_page}&page={number}>; rel="{rel}"'
+        for number, rel in ((page + 1, "next"), (last, "last"))
+        if page < last
+    ]
+    headers = dict(RATE_LIMIT_HEADERS)
+    if links:
+        headers["Link"] = ", ".join(links)
+    return repos, headers
+
+
+def github_languages(name):
+    # Byte per linguaggio, diversi per ogni repo
+    index = int(name.rsplit("-", 1)[-1]) if name[-1].isdigit() else 0
+    languages = {"Python": 40000 + index * 900, "Shell": 1200 + index * 10}
+    if index % 3 == 0:
+        languages["TypeScript"] = 25000 + index * 300
+    if index % 4 == 2:
+        languages["Go"] = 60000
+    return languages
+
+
+def github_graphql_payload(config, request):
+    """
+    Risposta alla query GraphQL di utils.get_github_dna (repo + README in un colpo).
+    """
+    count = min(request.get("variables", {}).get("count", 5), config.github_repos)
+    nodes = [
+        {
+            "name": f"repo-{i}",
+            "description": f"Progetto di test {i}",
+            "stargazerCount": i * 3,
+            "primaryLanguage": {"name": "Python"},
+            "repositoryTopics": {"nodes": [{"topic": {"name": "streamlit"}}]},
+            "readme": {"text": f"# repo-{i}\n" + _filler(config.readme_size, "readme")},
+            "readmeLower": None,
+        }
+        for i in range(count)
+    ]
+    return {"data": {"repositoryOwner": {"repositories": {"nodes": nodes}}}}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    config = StubConfig()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        path = parsed.path
+        config = self.config
+
+        if path.startswith("/github-api/users/"):
+            time.sleep(config.github_latency)
+            base_url = f"http://{self.headers.get('Host')}"
+            repos, headers = github_repo_page(
+                config, base_url, path, parse_qs(parsed.query)
+            )
+            self._send(200, json.dumps(repos), headers=headers)
+
+        elif path.startswith("/github-api/repos/") and path.endswith("/languages"):
+            time.sleep(config.github_latency)
+            languages = github_languages(path.split("/")[4])
+            self._send(200, json.dumps(languages), headers=RATE_LIMIT_HEADERS)
+
+        elif path.startswith("/github-raw/"):
+            time.sleep(config.github_latency)
+            # Metà delle repo ha il README solo su master (fallback main -> master)
+            parts = path.split("/")
+            repo, branch = parts[3], parts[4]
+            index = int(repo.rsplit("-", 1)[-1]) if repo[-1].isdigit() else 0
+            if branch == "main" and index % 2:
+                self._send(404, "404: Not Found", "text/plain")
+            else:
+                readme = f"# {repo}\n" + _filler(config.readme_size, "readme")
+                self._send(200, readme, "text/plain; charset=utf-8")
+
+        elif path.startswith("/site/"):
+            time.sleep(config.site_latency)
+            page = site_page(config, path.split("/")[2] or "portfolio")
+            self._send(200, page, "text/html; charset=utf-8")
+
+        elif path.startswith("/jina/"):
+            time.sleep(config.jina_latency)
+            page = "Title: Portfolio\n\n" + _filler(config.page_size, "page")
+            self._send(200, page, "text/plain; charset=utf-8")
+
+        else:
+            self._send(404, "{}")
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        config = self.config
+        if path.endswith("/graphql"):
+            time.sleep(config.github_latency)
+            payload = github_graphql_payload(config, request)
+            headers = dict(RATE_LIMIT_HEADERS, **{"X-RateLimit-Resource": "graphql"})
+            self._send(200, json.dumps(payload), headers=headers)
+            return
+
+        if not path.endswith("/chat/completions"):
+            self._send(404, "{}")
+            return
+
+        time.sleep(config.llm_latency)
+        if random.random() < config.llm_error_rate:
+            self._send(503, json.dumps({"error": {"message": "Provider overloaded"}}))
+            return
+        content = json.dumps(llm_payload(config, request))
+        usage = {
+            "prompt_tokens": sum(len(m["content"]) for m in request["messages"]) // 4,
+            "completion_tokens": len(content) // 4,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        base = {
+            "id": "chatcmpl-stub",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+        }
+
+        if not request.get("stream"):
+            body = dict(
+                base,
+                object="chat.completion",
+                choices=[
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                usage=usage,
+            )
+            self._send(200, json.dumps(body))
+            return
+
+        # Streaming SSE: un chunk ogni ~16 caratteri, come una generazione reale
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, finish_reason=None, with_usage=False):
+            chunk = dict(
+                base,
+                object="chat.completion.chunk",
+                choices=[
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+            )
+            if with_usage:
+                chunk["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        event({"role": "assistant", "content": ""})
+        for i in range(0, len(content), 16):
+            time.sleep(config.llm_chunk_delay)
+            event({"content": content[i : i + 16]})
+        event({}, "stop", with_usage=True)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class StubServers:
+    """
+    Avvia il server finto in un thread e restituisce gli URL base da usare
+    al posto di OpenRouter, GitHub, r.jina.ai e dei siti dei portfolio.
+    """
+
+    def __init__(self, config=None):
+        handler = type("ConfiguredStubHandler", (StubHandler,), {})
+        handler.config = config or StubConfig()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def urls(self):
+        return {
+            "openai": f"{self.base_url}/openai/v1",
+            "github_api": f"{self.base_url}/github-api",
+            "github_raw": f"{self.base_url}/github-raw",
+            "jina": f"{self.base_url}/jina",
+            "site": f"{self.base_url}/site",
+        }
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
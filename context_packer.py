@@ -0,0 +1,201 @@
+import re
+
+# --- CONFIGURAZIONE BUDGET ---
+# Token massimi di input (solo le sorgenti utente, prompt di sistema escluso)
+MODEL_TOKEN_BUDGETS = {
+    "gpt-4o-mini": 6000,
+    "openai/gpt-4o-mini": 6000,
+}
+DEFAULT_TOKEN_BUDGET = 4000
+
+# Priorità delle sorgenti: quota del budget assegnata a ciascuna.
+# La quota non usata da una sorgente corta viene ridistribuita alle altre.
+SOURCE_WEIGHTS = {
+    "cv_text": 0.45,
+    "personality_text": 0.15,
+    "github_data": 0.25,
+    "web_data": 0.15,
+}
+
+# Sorgenti composte da blocchi separati da "---" (un progetto / una pagina ciascuno)
+BLOCK_SEPARATOR = "\n---\n"
+BLOCK_SOURCES = ("github_data", "web_data")
+
+# Righe di navigazione / boilerplate tipiche delle pagine web e dei README
+BOILERPLATE_PATTERNS = re.compile(
+    r"^("
+    r"!\[.*\]\(.*\)"  # Immagini e badge markdown
+    r"|\[!\[.*"  # Badge cliccabili (shields.io ecc.)
+    r"|(\[[^\]]*\]\([^)]*\)\s*)+"  # Righe di soli link (menu di navigazione)
+    r"|url source:.*"  # Intestazione di r.jina.ai (già in SOURCE:)
+    r"|markdown content:"
+    r"|skip to (main )?content"
+    r"|(sign in|log in|sign up|menu|home|close|share)"
+    r"|.*(cookie|privacy policy|terms of (use|service)|all rights reserved).*"
+    r"|[\W_]+"  # Solo punteggiatura / decorazioni
+    r")$",
+    re.IGNORECASE,
+)
+
+_encoding = None
+
+
+def _get_encoding():
+    # tiktoken è opzionale: senza, usiamo la stima ~4 caratteri per token
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False
+    return _encoding
+
+
+def count_tokens(text):
+    """
+    Conta i token di un testo (tiktoken se disponibile, altrimenti stima).
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def get_token_budget(model):
+    return MODEL_TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET)
+
+
+def clean_text(text, boilerplate=True):
+    """
+    Rimuove righe vuote, righe duplicate e (con boilerplate=True, solo per
+    pagine web e README) il boilerplate, mantenendo l'ordine.
+    I separatori e le intestazioni strutturali non vengono deduplicati.
+    """
+    seen = set()
+    kept = []
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line == "---" or line.startswith(("###", "SOURCE:", "PROJECT:")):
+            kept.append(line)
+            continue
+        if boilerplate and len(line) < 120 and BOILERPLATE_PATTERNS.match(line):
+            continue
+        key = re.sub(r"\s+", " ", line.lower())
+        if key in seen:
+            continue
+        seen.add(key)
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def allocate(sizes, weights, budget):
+    """
+    Divide il budget tra le voci in proporzione ai pesi (water-filling):
+    una voce non riceve mai più di quanto le serve e l'avanzo passa alle altre.
+    """
+    allocation = {name: 0 for name in sizes}
+    active = {name for name, size in sizes.items() if size > 0}
+    remaining = budget
+
+    while active and remaining > 0:
+        total_weight = sum(weights[name] for name in active)
+        satisfied = set()
+        for name in active:
+            share = remaining * weights[name] / total_weight
+            if sizes[name] <= share:
+                allocation[name] = sizes[name]
+                satisfied.add(name)
+        if not satisfied:
+            # Nessuno ci sta per intero: ognuno prende la sua quota
+            for name in active:
+                allocation[name] = int(remaining * weights[name] / total_weight)
+            break
+        remaining -= sum(sizes[name] for name in satisfied)
+        active -= satisfied
+
+    return allocation
+
+
+def truncate_to_tokens(text, max_tokens):
+    """
+    Tronca il testo a max_tokens, tagliando sui confini di riga quando possibile.
+    """
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    kept = []
+    used = 0
+    for line in text.splitlines():
+        cost = count_tokens(line) + 1
+        if used + cost > max_tokens:
+            # Riga parziale solo se resta spazio utile
+            room = max_tokens - used
+            if room > 8:
+                encoding = _get_encoding()
+                if encoding:
+                    tokens = encoding.encode(line, disallowed_special=())
+                    partial = encoding.decode(tokens[:room])
+                else:
+                    partial = line[: room * 4]
+                kept.append(partial + "…")
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+
+def _pack_blocks(text, max_tokens):
+    # Ogni progetto / pagina riceve una quota equa del budget della sorgente
+    header, _, body = text.partition("\n")
+    if not header.startswith("###"):
+        header, body = "", text
+    blocks = [block for block in body.split(BLOCK_SEPARATOR) if block.strip()]
+    if not blocks:
+        return truncate_to_tokens(text, max_tokens)
+
+    budget = max_tokens - count_tokens(header) - len(blocks)
+    sizes = {i: count_tokens(block) for i, block in enumerate(blocks)}
+    allocation = allocate(sizes, {i: 1 for i in sizes}, budget)
+    packed = [
+        truncate_to_tokens(block, allocation[i])
+        for i, block in enumerate(blocks)
+        if allocation[i] > 0
+    ]
+    return "\n".join(filter(None, [header, BLOCK_SEPARATOR.join(packed)]))
+
+
+def pack_context(cv_text, personality_text, github_data="", web_data="", model=None):
+    """
+    Prepara le sorgenti per il prompt entro il budget di token del modello:
+    pulizia (duplicati; boilerplate solo per GitHub e web), ripartizione del
+    budget per priorità, troncamento per righe. Restituisce un dict con le 4
+    sorgenti compattate.
+    """
+    # CV e personalità sono testo dell'utente: "privacy policy" o "cookie" in
+    # una riga di CV sono contenuto, non boilerplate
+    sources = {
+        "cv_text": clean_text(cv_text, boilerplate=False),
+        "personality_text": clean_text(personality_text, boilerplate=False),
+        "github_data": clean_text(github_data),
+        "web_data": clean_text(web_data),
+    }
+    sizes = {name: count_tokens(text) for name, text in sources.items()}
+    allocation = allocate(sizes, SOURCE_WEIGHTS, get_token_budget(model))
+
+    packed = {}
+    for name, text in sources.items():
+        if sizes[name] <= allocation[name]:
+            packed[name] = text
+        elif name in BLOCK_SOURCES:
+            packed[name] = _pack_blocks(text, allocation[name])
+        else:
+            packed[name] = truncate_to_tokens(text, allocation[name])
+    return packed
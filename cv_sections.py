@@ -0,0 +1,229 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# --- SEZIONI DEL CV ---
+# Ordine = priorità: se una riga contiene parole chiave di più sezioni
+# vince la prima (stesso comportamento della vecchia catena di if/elif).
+SECTIONS = ("Profilo", "Esperienza", "Formazione", "Competenze", "Lingue", "Altro")
+DEFAULT_SECTION = "Altro"
+
+# Parole chiave per lingua (match per sottostringa sulla riga in minuscolo)
+LANGUAGE_KEYWORDS = {
+    "it": {
+        "Profilo": ["profilo"],
+        "Esperienza": ["esperienza", "lavorativ"],
+        "Formazione": ["formazione", "istruzione"],
+        "Competenze": ["competenze", "capacità"],
+        "Lingue": ["lingue"],
+    },
+    "en": {
+        "Profilo": ["profile", "summary"],
+        "Esperienza": ["experience"],
+        "Formazione": ["education"],
+        "Competenze": ["skills"],
+        "Lingue": ["languages"],
+    },
+    "es": {
+        "Profilo": ["perfil", "resumen"],
+        "Esperienza": ["experiencia", "laboral"],
+        "Formazione": ["formación", "educación"],
+        "Competenze": ["habilidades", "competencias"],
+        "Lingue": ["idiomas"],
+    },
+    "fr": {
+        "Profilo": ["profil", "résumé"],
+        "Esperienza": ["expérience", "professionnel"],
+        "Formazione": ["formation", "éducation"],
+        "Competenze": ["compétences"],
+        "Lingue": ["langues"],
+    },
+    "de": {
+        "Profilo": ["profil", "zusammenfassung"],
+        "Esperienza": ["berufserfahrung", "erfahrung"],
+        "Formazione": ["ausbildung", "bildung", "studium"],
+        "Competenze": ["kenntnisse", "fähigkeiten"],
+        "Lingue": ["sprachen"],
+    },
+}
+DEFAULT_LANGUAGES = ("it", "en")
+
+
+class SectionClassifier:
+    """
+    Classificatore delle righe di un CV nelle sezioni standard.
+    Tutte le parole chiave sono compilate in un'unica regex con un gruppo
+    nominato per sezione: una sola scansione per riga invece di N test `in`.
+    """
+
+    def __init__(self, languages=DEFAULT_LANGUAGES):
+        self._keywords = {section: [] for section in SECTIONS[:-1]}
+        self._pattern = None
+        for language in languages:
+            self.add_keywords(LANGUAGE_KEYWORDS[language])
+
+    def add_keywords(self, keywords):
+        """
+        Aggiunge parole chiave {sezione: [parole]} (es. una nuova lingua).
+        """
+        for section, words in keywords.items():
+            for word in words:
+                if word.lower() not in self._keywords[section]:
+                    self._keywords[section].append(word.lower())
+        self._pattern = None
+
+    def _compile(self):
+        groups = []
+        for section, words in self._keywords.items():
+            if words:
+                alternatives = "|".join(re.escape(word) for word in words)
+                groups.append(f"(?P<{section}>{alternatives})")
+        if not groups:
+            # Nessuna parola chiave: nessuna riga è un'intestazione
+            self._pattern = re.compile("(?!)")
+            return
+        # Lookahead: ogni posizione viene provata, anche se i match si sovrappongono;
+        # a parità di posizione vince il gruppo con priorità più alta
+        self._pattern = re.compile("(?=" + "|".join(groups) + ")")
+
+    def classify(self, line):
+        """
+        Restituisce la sezione indicata dalla riga, o None se non è un'intestazione.
+        """
+        if self._pattern is None:
+            self._compile()
+        best = None
+        for match in self._pattern.finditer(line.lower()):
+            index = SECTIONS.index(match.lastgroup)
+            if best is None or index < best:
+                best = index
+                if index == 0:
+                    break
+        return SECTIONS[best] if best is not None else None
+
+    def split(self, pages):
+        """
+        Divide il testo (lista di pagine) in sezioni con un solo passaggio lineare.
+        """
+        sezioni = {section: [] for section in SECTIONS}
+        current_section = DEFAULT_SECTION
+        for page_text in pages:
+            for riga in page_text.splitlines():
+                riga_clean = riga.strip()
+                if not riga_clean:
+                    continue
+                current_section = self.classify(riga_clean) or current_section
+                sezioni[current_section].append(riga_clean)
+        return sezioni
+
+
+def format_sections(sezioni):
+    """
+    Ricostruzione Testo Strutturato: "--- SEZIONE ---" seguito dalle righe.
+    """
+    parts = []
+    for sec_name, lines in sezioni.items():
+        if lines:  # Solo se c'è contenuto
+            parts.append(f"--- {sec_name.upper()} ---\n" + "\n".join(lines))
+    return "\n\n".join(parts)
+
+
+default_classifier = SectionClassifier()
+
+
+# --- CLI: PARSING MASSIVO DI UNA CARTELLA DI PDF ---
+_worker_classifier = None
+
+
+def _init_worker(languages):
+    global _worker_classifier
+    _worker_classifier = SectionClassifier(languages)
+
+
+def _parse_pdf(path):
+    import fitz  # PyMuPDF, caricato solo nei worker
+
+    try:
+        with fitz.open(path) as doc:
+            pages = [page.get_text() for page in doc]
+        sezioni = _worker_classifier.split(pages)
+        return {
+            "file": path,
+            "pages": len(pages),
+            "sections": {name: lines for name, lines in sezioni.items() if lines},
+        }
+    except Exception as e:
+        return {"file": path, "error": str(e)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Estrae le sezioni strutturate da una cartella di CV in PDF."
+    )
+    parser.add_argument("directory", help="Cartella con i PDF (ricerca ricorsiva)")
+    parser.add_argument(
+        "-o", "--output", help="File JSONL di output (default: stdout)"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=os.cpu_count(), help="Processi worker"
+    )
+    parser.add_argument(
+        "-l",
+        "--languages",
+        default=",".join(DEFAULT_LANGUAGES),
+        help=f"Lingue delle parole chiave ({', '.join(LANGUAGE_KEYWORDS)})",
+    )
+    args = parser.parse_args(argv)
+
+    languages = tuple(
+        lang.strip() for lang in args.languages.split(",") if lang.strip()
+    )
+    if not languages:
+        parser.error(
+            f"nessuna lingua indicata (disponibili: {', '.join(LANGUAGE_KEYWORDS)})"
+        )
+    unknown = [lang for lang in languages if lang not in LANGUAGE_KEYWORDS]
+    if unknown:
+        parser.error(
+            f"lingue non supportate: {', '.join(unknown)} "
+            f"(disponibili: {', '.join(LANGUAGE_KEYWORDS)})"
+        )
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(args.directory)
+        for name in files
+        if name.lower().endswith(".pdf")
+    )
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    errors = 0
+    try:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_init_worker,
+            initargs=(languages,),
+        ) as executor:
+            for result in executor.map(_parse_pdf, paths, chunksize=4):
+                errors += "error" in result
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    rate = len(paths) / elapsed if elapsed > 0 else 0.0
+    print(
+        f"[CV SECTIONS] {len(paths)} documenti ({errors} errori) in {elapsed:.2f}s "
+        f"= {rate:.1f} docs/sec con {args.workers} worker",
+        file=sys.stderr,
+    )
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
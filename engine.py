@@ -1,23 +1,27 @@
-import streamlit as st
+import json
+import time
+
 from pydantic import BaseModel, Field
-from openai import OpenAI
 
-# Nota: Usiamo st.secrets per le chiavi, non serve più dotenv
+import context_packer
+import llm_cache
+import llm_client
+import llm_resilience
+import semantic_cache
+import single_flight
+import telemetry
+
+# Nota: la chiave arriva da st.secrets tramite llm_client.py, non serve dotenv
 
 
 # --- CONFIGURAZIONE MOTORE ---
-# Ora usiamo l'input dell'utente dalla sidebar
+# Client OpenRouter condiviso per processo (llm_client.py), con logic.py
 def get_client():
-    # Recupera la chiave dai Secrets (Protetto per deploy)
-    api_key = st.secrets.get("OPENROUTER_API_KEY")
-    base_url = "https://openrouter.ai/api/v1"
+    return llm_client.get_client()
 
-    if not api_key:
-        print("[ENGINE] Nessuna API Key OpenRouter trovata nei secrets.")
-        raise ValueError("API Key mancante.")
 
-    print("[ENGINE] MODALITÀ PROD: OpenRouter connesso con chiave Secrets.")
-    return OpenAI(base_url=base_url, api_key=api_key)
+# Prompt identici in volo da più sessioni: una sola chiamata (single_flight.py)
+_llm_flight = single_flight.group("llm")
 
 
 # --- DATA MODELS ---
@@ -51,18 +55,32 @@ class CTSAnalysis(BaseModel):
     trajectory_3_visionary: Trajectory
 
 
-def generate_trajectory_simulation(
-    cv_text: str,
-    personality_text: str,
-    github_data: str = "",
-    web_data: str = "",
-    api_model: str = None,
-):
-    """
-    Analizza i dati per costruire un modello predittivo del 'Future Self' dell'utente.
-    """
+class ArchetypeProfile(BaseModel):
+    archetype_title: str = Field(
+        ...,
+        description="Titolo in Inglese, Epico e Professionale (es. Full-Stack Visionary)",
+    )
+    archetype_category: str = Field(
+        ..., description="Scegli una tra: DESIGN, TECH, MARKETING"
+    )
+    power_color: str = Field(
+        ..., description="Un codice HEX colore adatto all'archetipo (es. #00FF00)"
+    )
+    analysis_summary: str = Field(
+        ..., description="Breve analisi profonda (2 frasi) in ITALIANO."
+    )
+    future_prediction: str = Field(
+        ..., description="Una predizione sul ruolo futuro in ITALIANO."
+    )
+    key_skills: list[str] = Field(..., description="Tre skill chiave")
+
 
-    system_prompt = """
+class CombinedAnalysis(CTSAnalysis):
+    # Modalità combinata: archetipo + traiettorie in una sola richiesta
+    archetype: ArchetypeProfile
+
+
+SYSTEM_PROMPT = """
     # SYSTEM ROLE: CAREER TRAJECTORY SIMULATOR (CTS)
 
 **OBJECTIVE:**
@@ -98,6 +116,29 @@ Return a JSON structure containing:
 }
     """
 
+
+COMBINED_SYSTEM_PROMPT = (
+    SYSTEM_PROMPT
+    + """
+**ARCHETYPE (SAME RESPONSE):**
+In the same JSON, also fill the "archetype" object: the ARCHETYPE the user will become thanks to their personality and skills.
+Do NOT look at job titles. Look at thought patterns, failures and ambitions.
+* archetype_title: English, epic and professional (e.g. Full-Stack Visionary).
+* archetype_category: one of DESIGN, TECH, MARKETING.
+* power_color: a HEX color suited to the archetype (e.g. #00FF00).
+* analysis_summary: short deep analysis (2 sentences) in ITALIAN.
+* future_prediction: a prediction about the future role in ITALIAN.
+* key_skills: exactly 3 skills.
+    """
+)
+
+
+def build_user_prompt(
+    cv_text: str, personality_text: str, github_data: str = "", web_data: str = ""
+):
+    """
+    Compone il prompt utente con tutte le sorgenti di input.
+    """
     user_prompt = f"""
     --- OBIETTIVO ---
     Analizza questi dati ed estrai le 3 Traiettorie Future.
@@ -116,28 +157,433 @@ Return a JSON structure containing:
     [WEB/CREATIVE DNA]
     {web_data}
     """
+    return user_prompt
+
+
+def _load_cached(cache_key, model=CTSAnalysis):
+    """
+    Legge e valida un risultato dalla cache LLM (None se assente o non valido).
+    """
+    cached = llm_cache.lookup(cache_key)
+    if cached is None:
+        return None
+    try:
+        return model.model_validate_json(cached)
+    except ValueError as e:
+        # Voce corrotta o schema cambiato: rigeneriamo
+        print(f"[ENGINE] Voce di cache non valida, rigenero: {e}")
+        return None
+
+
+def _semantic_query(api_model, system_prompt, packed):
+    """
+    Chiave di ricerca della cache semantica: solo il CV è confrontato per
+    similarità; personalità, GitHub e web devono coincidere esattamente
+    (entrano nel namespace insieme a modello e system prompt).
+    """
+    space = semantic_cache.namespace(
+        api_model,
+        system_prompt,
+        packed["personality_text"],
+        packed["github_data"],
+        packed["web_data"],
+    )
+    return space, packed["cv_text"]
+
+
+def _load_similar(space, cv_text, cache_key, stage):
+    """
+    Risultato di un CV quasi identico (cache semantica), validato come
+    CTSAnalysis. Viene salvato anche sotto la chiave esatta del prompt corrente.
+    """
+    payload = semantic_cache.lookup(space, cv_text, stage)
+    if payload is None:
+        return None
+    try:
+        result = CTSAnalysis.model_validate_json(payload)
+    except ValueError as e:
+        print(f"[ENGINE] Voce di cache semantica non valida, rigenero: {e}")
+        return None
+    llm_cache.store(cache_key, payload)
+    return result
+
+
+def _packed_prompt(stage, cv_text, personality_text, github_data, web_data, model):
+    """
+    Sorgenti compattate entro il budget di token del modello (dict di
+    context_packer.pack_context). Restituisce None (span in errore) se la
+    preparazione fallisce.
+    """
+    try:
+        return context_packer.pack_context(
+            cv_text, personality_text, github_data, web_data, model
+        )
+    except Exception as e:
+        stage.fail(e)
+        print(f"Errore nella preparazione del prompt: {e}")
+        return None
+
+
+def generate_trajectory_simulation(
+    cv_text: str,
+    personality_text: str,
+    github_data: str = "",
+    web_data: str = "",
+    api_model: str = None,
+    use_cache: bool = True,
+):
+    """
+    Analizza i dati per costruire un modello predittivo del 'Future Self' dell'utente.
+    Con use_cache=False la cache LLM viene ignorata (forza una nuova generazione).
+    """
 
     if api_model is None:
         api_model = "gpt-4o-mini"  # Default per produzione
 
-    try:
-        client = get_client()
+    system_prompt = SYSTEM_PROMPT
+
+    # Cache content-addressed: input identici => risultato già validato, zero rete
+    with telemetry.span("llm.trajectory", model=api_model) as stage:
+        packed = _packed_prompt(
+            stage, cv_text, personality_text, github_data, web_data, api_model
+        )
+        if packed is None:
+            return None
+        user_prompt = build_user_prompt(**packed)
+        cache_key = llm_cache.make_key(api_model, system_prompt, user_prompt)
+        # CV quasi identici: risultato di un prompt simile (semantic_cache.py)
+        space, query = _semantic_query(api_model, system_prompt, packed)
+        if use_cache:
+            cached = _load_cached(cache_key)
+            if cached is not None:
+                stage.set(cache="hit")
+                return cached
+            cached = _load_similar(space, query, cache_key, stage)
+            if cached is not None:
+                stage.set(cache="semantic")
+                return cached
+        stage.set(cache="miss")
 
+        # Stesso prompt già in generazione per un'altra sessione: si attende quello
+        result = _llm_flight.do(
+            cache_key,
+            _request_trajectory,
+            system_prompt,
+            user_prompt,
+            api_model,
+            cache_key,
+            space,
+            query,
+            stage,
+        )
+        if result is None and stage.error is None:
+            stage.fail("Generazione condivisa fallita")
+        return result
+
+
+def _request_trajectory(
+    system_prompt, user_prompt, api_model, cache_key, space, query, stage
+):
+    """
+    Chiamata LLM per CTSAnalysis: una sola per prompt anche con più sessioni
+    in attesa (_llm_flight). Il risultato valido finisce in cache, se non
+    viene dal modello di fallback.
+    """
+    try:
         # Nota: Ollama con parse() richiede un modello recente e ben supportato.
         # Se 'llama3' fallisce con parse(), considerare l'uso di json mode manuale come in logic.py
-        completion = client.beta.chat.completions.parse(
-            model=api_model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            response_format=CTSAnalysis,  # Qui forziamo l'output strutturato
+        # Retry, hedging e fallback di modello: llm_resilience.py
+        completion = llm_resilience.call(
+            lambda client, model: client.beta.chat.completions.parse(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                response_format=CTSAnalysis,  # Qui forziamo l'output strutturato
+            ),
+            api_model,
         )
 
+        telemetry.record_usage(completion.usage, completion.model, stage)
+
         # Restituisce l'oggetto Pydantic validato
-        return completion.choices[0].message.parsed
+        result = completion.choices[0].message.parsed
+        if result is None:
+            stage.fail("Risposta senza contenuto strutturato")
+        elif not llm_resilience.used_fallback(stage):
+            # In cache solo le risposte del modello richiesto (chiave = modello)
+            llm_cache.store(cache_key, result.model_dump_json())
+            semantic_cache.remember(space, query, cache_key)
+        return result
 
     except Exception as e:
         # In produzione qui loggheresti l'errore seriamente
+        stage.fail(e)
         print(f"Errore nella generazione AI: {e}")
         return None
+
+
+def generate_combined_analysis(
+    cv_text: str,
+    personality_text: str,
+    github_data: str = "",
+    web_data: str = "",
+    api_model: str = None,
+    use_cache: bool = True,
+):
+    """
+    Modalità combinata: archetipo e 3 traiettorie con una sola chiamata.
+    CV e personalità vengono inviati una volta sola invece di due.
+    Restituisce un CombinedAnalysis validato (o None in caso di errore).
+    """
+    if api_model is None:
+        api_model = "gpt-4o-mini"  # Default per produzione
+
+    system_prompt = COMBINED_SYSTEM_PROMPT
+
+    with telemetry.span("llm.combined", model=api_model) as stage:
+        packed = _packed_prompt(
+            stage, cv_text, personality_text, github_data, web_data, api_model
+        )
+        if packed is None:
+            return None
+        user_prompt = build_user_prompt(**packed)
+        cache_key = llm_cache.make_key(api_model, system_prompt, user_prompt)
+        if use_cache:
+            cached = _load_cached(cache_key, CombinedAnalysis)
+            if cached is not None:
+                stage.set(cache="hit")
+                return cached
+        stage.set(cache="miss")
+
+        result = _llm_flight.do(
+            cache_key,
+            _request_combined,
+            system_prompt,
+            user_prompt,
+            api_model,
+            cache_key,
+            stage,
+        )
+        if result is None and stage.error is None:
+            stage.fail("Generazione condivisa fallita")
+        return result
+
+
+def _request_combined(system_prompt, user_prompt, api_model, cache_key, stage):
+    """
+    Chiamata LLM per CombinedAnalysis, condivisa come _request_trajectory.
+    """
+    try:
+        completion = llm_resilience.call(
+            lambda client, model: client.beta.chat.completions.parse(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                response_format=CombinedAnalysis,
+            ),
+            api_model,
+        )
+
+        telemetry.record_usage(completion.usage, completion.model, stage)
+
+        result = completion.choices[0].message.parsed
+        if result is None:
+            stage.fail("Risposta senza contenuto strutturato")
+        elif not llm_resilience.used_fallback(stage):
+            llm_cache.store(cache_key, result.model_dump_json())
+        return result
+
+    except Exception as e:
+        stage.fail(e)
+        print(f"Errore nella generazione AI (combinata): {e}")
+        return None
+
+
+# --- STREAMING ---
+# Ordine dei campi di CTSAnalysis: la UI li disegna appena sono completi
+STREAM_FIELDS = (
+    "core_vector",
+    "trajectory_1_strategic",
+    "trajectory_2_challenge",
+    "trajectory_3_visionary",
+)
+
+
+class IncrementalObjectParser:
+    """
+    Parser incrementale per l'oggetto JSON di primo livello prodotto in streaming.
+    Ad ogni feed() restituisce le coppie (chiave, valore) il cui valore è
+    diventato sintatticamente completo; i valori a metà restano in attesa.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._started = False
+        self._decoder = json.JSONDecoder()
+
+    def _skip_whitespace(self, index):
+        while index < len(self.buffer) and self.buffer[index] in " \t\r\n":
+            index += 1
+        return index
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        completed = []
+
+        while True:
+            index = self._skip_whitespace(self._pos)
+            if index >= len(self.buffer):
+                break
+
+            if not self._started:
+                # Salta eventuale testo prima della prima graffa
+                brace = self.buffer.find("{", index)
+                if brace == -1:
+                    break
+                self._pos = brace + 1
+                self._started = True
+                continue
+
+            if self.buffer[index] in ",}":
+                self._pos = index + 1
+                continue
+
+            try:
+                key, index = self._decoder.raw_decode(self.buffer, index)
+            except json.JSONDecodeError:
+                break
+            index = self._skip_whitespace(index)
+            if index >= len(self.buffer) or self.buffer[index] != ":":
+                break
+            index = self._skip_whitespace(index + 1)
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, index)
+            except json.JSONDecodeError:
+                break
+            # Un numero a fine buffer potrebbe avere ancora cifre in arrivo
+            if isinstance(value, (int, float)) and end >= len(self.buffer):
+                break
+
+            completed.append((key, value))
+            self._pos = end
+
+        return completed
+
+
+def _stream_fields(client, model, parser, stage, messages):
+    # Una richiesta in streaming: (campo, valore) appena ogni campo è completo
+    with client.beta.chat.completions.stream(
+        model=model,
+        messages=messages,
+        response_format=CTSAnalysis,
+        stream_options={"include_usage": True},
+    ) as stream:
+        for event in stream:
+            if event.type == "chunk" and event.chunk.usage is not None:
+                telemetry.record_usage(event.chunk.usage, model, stage)
+            if event.type != "content.delta":
+                continue
+            if "first_token_ms" not in stage.attributes:
+                elapsed = time.perf_counter() - stage.start
+                stage.set(first_token_ms=round(elapsed * 1000, 2))
+            for key, value in parser.feed(event.delta):
+                if key == "core_vector" and isinstance(value, str):
+                    yield key, value
+                elif key in STREAM_FIELDS:
+                    try:
+                        yield key, Trajectory.model_validate(value)
+                    except ValueError:
+                        # Card incompleta: la validazione finale deciderà
+                        pass
+
+
+def stream_trajectory_simulation(
+    cv_text: str,
+    personality_text: str,
+    github_data: str = "",
+    web_data: str = "",
+    api_model: str = None,
+    use_cache: bool = True,
+):
+    """
+    Versione streaming di generate_trajectory_simulation.
+    Generatore di eventi (campo, valore):
+      ("core_vector", str), ("trajectory_*", Trajectory) appena completi,
+      infine ("complete", CTSAnalysis validato oppure None in caso di errore).
+    """
+    if api_model is None:
+        api_model = "gpt-4o-mini"  # Default per produzione
+
+    system_prompt = SYSTEM_PROMPT
+
+    # Span gestito a mano: un generatore non può tenere aperto il contesto
+    # del chiamante tra un yield e l'altro
+    stage = telemetry.Span(
+        "llm.trajectory_stream", telemetry.current_span(), model=api_model
+    )
+    try:
+        packed = _packed_prompt(
+            stage, cv_text, personality_text, github_data, web_data, api_model
+        )
+        if packed is None:
+            yield "complete", None
+            return
+        user_prompt = build_user_prompt(**packed)
+        cache_key = llm_cache.make_key(api_model, system_prompt, user_prompt)
+        space, query = _semantic_query(api_model, system_prompt, packed)
+        if use_cache:
+            cached = _load_cached(cache_key)
+            if cached is not None:
+                stage.set(cache="hit")
+            else:
+                cached = _load_similar(space, query, cache_key, stage)
+                if cached is not None:
+                    stage.set(cache="semantic")
+            if cached is not None:
+                for field in STREAM_FIELDS:
+                    yield field, getattr(cached, field)
+                yield "complete", cached
+                return
+        stage.set(cache="miss")
+
+        try:
+            # Retry e fallback di modello solo finché non è arrivato contenuto:
+            # i campi già mostrati nella UI non possono essere ritrattati
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ]
+            client = llm_resilience.get_client()
+            plan = llm_resilience.RetryPlan(api_model, span=stage)
+            for model, attempt in plan:
+                parser = IncrementalObjectParser()
+                try:
+                    yield from _stream_fields(client, model, parser, stage, messages)
+                except Exception as e:
+                    if parser.buffer:
+                        raise
+                    plan.failed(model, attempt, e)
+                    continue
+                plan.succeeded(model, attempt)
+                break
+            else:
+                raise plan.last_error
+
+            # Validazione finale sull'intero modello Pydantic
+            result = CTSAnalysis.model_validate_json(parser.buffer)
+            if not llm_resilience.used_fallback(stage):
+                llm_cache.store(cache_key, result.model_dump_json())
+                semantic_cache.remember(space, query, cache_key)
+            yield "complete", result
+
+        except Exception as e:
+            stage.fail(e)
+            print(f"Errore nella generazione AI (streaming): {e}")
+            yield "complete", None
+    finally:
+        stage.finish()
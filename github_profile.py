@@ -0,0 +1,188 @@
+import time
+from datetime import datetime
+
+# --- CONFIGURAZIONE PROFILO GITHUB COMPLETO ---
+# Modalità "deep" di utils.get_github_dna: invece di leggere più README, tutte le
+# repo pubbliche (lista paginata + byte per linguaggio di ciascuna) vengono
+# ridotte con NumPy a un vettore di competenze pesato e a un riepilogo di
+# attività di poche righe. Il prompt cresce di un blocco fisso, non con le repo.
+# Funzioni pure: il download resta in utils.py.
+PROFILE_HALF_LIFE_DAYS = 365  # Una repo ferma da un anno pesa la metà
+PROFILE_STAR_WEIGHT = 0.25  # Peso di log(1 + stelle) sul contributo di una repo
+PROFILE_TOP_LANGUAGES = 8  # Linguaggi riportati nel blocco
+PROFILE_MIN_SHARE = 0.01  # Sotto questa quota un linguaggio non viene riportato
+PROFILE_REPO_SHARE = 0.1  # Quota minima perché una repo "usi" un linguaggio
+PROFILE_TOP_REPOS = 3  # Repo più stellate citate per nome
+PROFILE_YEARS = 5  # Anni riportati nell'istogramma degli ultimi push
+ACTIVE_DAYS = (90, 365)  # Finestre di attività recente
+
+SECONDS_PER_DAY = 86400
+
+
+def _timestamp(value):
+    # Date ISO 8601 di GitHub ("2024-05-01T10:00:00Z"); mancanti -> NaN
+    if not value:
+        return float("nan")
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return float("nan")
+
+
+def _compact_number(value):
+    if value >= 1000:
+        return f"{value / 1000:.1f}k"
+    return str(int(value))
+
+
+def language_matrix(repos, languages):
+    """
+    Matrice repo x linguaggio dei byte di codice. Le repo senza dettaglio
+    (`languages` non contiene il nome) contano la dimensione in KB della lista
+    REST sul solo linguaggio principale. Restituisce (nomi linguaggi, matrice).
+    """
+    import numpy as np
+
+    names = sorted(
+        {language for breakdown in languages.values() for language in breakdown}
+        | {repo["language"] for repo in repos if repo.get("language")}
+    )
+    columns = {name: i for i, name in enumerate(names)}
+    matrix = np.zeros((len(repos), len(names)), dtype=np.float64)
+    for row, repo in enumerate(repos):
+        breakdown = languages.get(repo.get("name"))
+        if breakdown:
+            for language, size in breakdown.items():
+                matrix[row, columns[language]] = size
+        elif repo.get("language"):
+            matrix[row, columns[repo["language"]]] = (repo.get("size") or 0) * 1024
+    return names, matrix
+
+
+def skill_vector(repos, languages, now=None):
+    """
+    Quota di ogni linguaggio nel portfolio (somma 1). Ogni repo pesa
+    log(1 + byte) per recenza dell'ultimo push e popolarità: una repo enorme
+    con codice vendorizzato non schiaccia le altre. Restituisce
+    (nomi, quote, numero di repo che usano ciascun linguaggio).
+    """
+    import numpy as np
+
+    names, matrix = language_matrix(repos, languages)
+    if not names:
+        return names, np.zeros(0), np.zeros(0, dtype=np.int64)
+
+    now = time.time() if now is None else now
+    totals = matrix.sum(axis=1)
+    shares = np.divide(
+        matrix, totals[:, None], out=np.zeros_like(matrix), where=totals[:, None] > 0
+    )
+    pushed = np.array([_timestamp(repo.get("pushed_at")) for repo in repos])
+    age_days = np.nan_to_num((now - pushed) / SECONDS_PER_DAY, nan=np.inf)
+    recency = 0.5 ** (np.maximum(age_days, 0) / PROFILE_HALF_LIFE_DAYS)
+    stars = np.array([repo.get("stargazers_count") or 0 for repo in repos])
+    weights = recency * np.log1p(totals) * (1 + PROFILE_STAR_WEIGHT * np.log1p(stars))
+
+    skills = shares.T @ weights
+    total = skills.sum()
+    if total > 0:
+        skills /= total
+    repo_counts = (shares >= PROFILE_REPO_SHARE).sum(axis=0)
+    return names, skills, repo_counts
+
+
+def activity_summary(repos, now=None):
+    """
+    Conteggi di attività dell'account: repo originali / fork / archiviate,
+    stelle, repo attive nelle finestre ACTIVE_DAYS, repo per anno dell'ultimo
+    push, anno della prima repo.
+    """
+    import numpy as np
+
+    now = time.time() if now is None else now
+    forks = np.array([bool(repo.get("fork")) for repo in repos], dtype=bool)
+    archived = np.array([bool(repo.get("archived")) for repo in repos], dtype=bool)
+    stars = np.array([repo.get("stargazers_count") or 0 for repo in repos])
+    pushed = np.array([_timestamp(repo.get("pushed_at")) for repo in repos])
+    created = np.array([_timestamp(repo.get("created_at")) for repo in repos])
+
+    age_days = (now - pushed) / SECONDS_PER_DAY
+    years, counts = np.unique(
+        [datetime.fromtimestamp(value).year for value in pushed[~np.isnan(pushed)]],
+        return_counts=True,
+    )
+    # Le repo più stellate tra le originali (le stelle di un fork non sono sue)
+    ranking = np.where(forks, -1, stars)
+    order = np.argsort(-ranking, kind="stable")[:PROFILE_TOP_REPOS]
+    return {
+        "repos": len(repos),
+        "forks": int(forks.sum()),
+        "archived": int(archived.sum()),
+        "stars": int(stars[~forks].sum()),
+        "active": {days: int((age_days <= days).sum()) for days in ACTIVE_DAYS},
+        "since": (
+            datetime.fromtimestamp(np.nanmin(created)).year
+            if not np.isnan(created).all()
+            else None
+        ),
+        "last_push_by_year": dict(
+            zip(years.tolist()[-PROFILE_YEARS:], counts.tolist()[-PROFILE_YEARS:])
+        ),
+        "top_repos": [
+            (repos[i].get("name", "Unknown"), int(stars[i]))
+            for i in order
+            if ranking[i] > 0
+        ],
+    }
+
+
+def build_profile(repos, languages, now=None):
+    """
+    Blocco compatto per il prompt (poche righe, qualunque sia il numero di
+    repo). `repos` è la lista REST completa, `languages` {nome repo: {linguaggio:
+    byte}} per le repo di cui è stato scaricato il dettaglio. I fork entrano
+    solo nei conteggi: le competenze vengono dalle repo originali.
+    """
+    import numpy as np
+
+    if not repos:
+        return ""
+    activity = activity_summary(repos, now)
+    originals = [repo for repo in repos if not repo.get("fork")]
+    names, skills, repo_counts = skill_vector(originals, languages, now)
+
+    lines = [
+        f"SKILL PROFILE: {activity['repos']} public repos "
+        f"({activity['repos'] - activity['forks']} original, "
+        f"{activity['forks']} forks, {activity['archived']} archived), "
+        f"{_compact_number(activity['stars'])} stars"
+    ]
+    ranked = np.argsort(-skills, kind="stable")
+    top = [
+        f"{names[i]} {skills[i]:.0%} ({repo_counts[i]} repos)"
+        for i in ranked[:PROFILE_TOP_LANGUAGES]
+        if skills[i] >= PROFILE_MIN_SHARE
+    ]
+    if top:
+        lines.append(
+            f"LANGUAGES (weighted by code, recency, stars): {', '.join(top)}"
+        )
+    active = ", ".join(
+        f"{count} repos pushed in the last {days} days"
+        for days, count in activity["active"].items()
+    )
+    if activity["since"]:
+        active += f"; on GitHub since {activity['since']}"
+    lines.append(f"ACTIVITY: {active}")
+    if activity["last_push_by_year"]:
+        per_year = ", ".join(
+            f"{year}: {count}" for year, count in activity["last_push_by_year"].items()
+        )
+        lines.append(f"LAST PUSH BY YEAR: {per_year}")
+    if activity["top_repos"]:
+        top_repos = ", ".join(
+            f"{name} ({_compact_number(stars)} stars)"
+            for name, stars in activity["top_repos"]
+        )
+        lines.append(f"MOST STARRED: {top_repos}")
+    return "\n".join(lines) + "\n---\n"
@@ -0,0 +1,283 @@
+import re
+from html.parser import HTMLParser
+
+# --- CONFIGURAZIONE ESTRAZIONE HTML ---
+# Estrattore locale HTML -> testo leggibile, alternativo a r.jina.ai: niente hop
+# di rete in più né dipendenze esterne (solo html.parser della libreria standard).
+# Toglie script/stili/navigazione, cerca il contenuto principale (<main>,
+# <article>, role="main") e conserva titoli ("#", "##", ...) e liste ("- ").
+
+# Elementi il cui contenuto non è mai testo per l'LLM
+CODE_TAGS = {
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "svg",
+    "canvas",
+    "iframe",
+    "object",
+}
+# Contorno della pagina: scartato, salvo che contenga il contenuto principale
+SKIP_TAGS = {
+    "nav",
+    "footer",
+    "aside",
+    "form",
+    "button",
+    "select",
+    "textarea",
+    "dialog",
+}
+SKIP_ROLES = {"navigation", "contentinfo", "complementary", "search", "dialog"}
+# Token interi di class / id tipici di banner cookie, menu e widget di
+# condivisione ("cookie-banner" sì, "no-sidebar" e "shareable" no)
+BOILERPLATE_PATTERN = re.compile(
+    r"(cookie|consent|navbar|menu|breadcrumb|share|social|sidebar|newsletter"
+    r"|popup|modal|subscribe)s?([-_](banner|bar|notice|links|buttons|wrapper))?",
+    re.IGNORECASE,
+)
+# Elementi che chiudono una riga di testo
+BLOCK_TAGS = {
+    "p",
+    "div",
+    "section",
+    "article",
+    "main",
+    "header",
+    "li",
+    "ul",
+    "ol",
+    "dl",
+    "dt",
+    "dd",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "blockquote",
+    "pre",
+    "table",
+    "tr",
+    "td",
+    "th",
+    "figure",
+    "figcaption",
+    "br",
+    "hr",
+}
+VOID_TAGS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "param",
+    "source",
+    "track",
+    "wbr",
+}
+HEADING_TAGS = {f"h{level}": level for level in range(1, 7)}
+MAIN_TAGS = {"main", "article"}
+# Sotto questa quantità di testo il contenitore "principale" non è affidabile
+MAIN_MIN_CHARS = 200
+MAIN_MIN_SHARE = 0.25  # ...o sotto questa quota del testo della pagina
+# Senza contenitore principale: righe corte fatte solo di link (menu) scartate
+LINK_LINE_MAX_CHARS = 30
+
+
+class _Line:
+    __slots__ = ("text", "prefix", "containers", "boilerplate", "link_chars")
+
+    def __init__(self, text, prefix, containers, boilerplate, link_chars):
+        self.text = text
+        self.prefix = prefix
+        self.containers = containers
+        self.boilerplate = boilerplate
+        self.link_chars = link_chars
+
+
+class _TextExtractor(HTMLParser):
+    """
+    Visita l'HTML una volta: righe di testo con il loro prefisso (titolo, voce
+    di lista), i contenitori principali e di contorno che le racchiudono e i
+    caratteri di link. Il contorno si scarta solo alla fine: un contenitore
+    principale al suo interno lo salva (`rescued`).
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.lines = []
+        self.rescued = set()
+        # (tag, codice, id contorno o None, id contenitore principale o None)
+        self._stack = []
+        self._skip = 0
+        self._containers = ()
+        self._boilerplate = ()
+        self._next_id = 0
+        self._links = 0
+        self._in_title = False
+        self._parts = []
+        self._link_chars = 0
+        self._prefix = ""
+
+    def _flush(self):
+        text = " ".join("".join(self._parts).split())
+        if text:
+            self.lines.append(
+                _Line(
+                    text,
+                    self._prefix,
+                    self._containers,
+                    self._boilerplate,
+                    self._link_chars,
+                )
+            )
+            self._prefix = ""
+        self._parts = []
+        self._link_chars = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in VOID_TAGS:
+            return
+        if tag == "title" and not self._skip:
+            # Non il <title> di un'icona SVG
+            self._in_title = True
+
+        attributes = dict(attrs)
+        role = (attributes.get("role") or "").lower()
+        code = tag in CODE_TAGS
+        boilerplate = None
+        container = None
+        if tag in MAIN_TAGS or role == "main":
+            container = self._new_id()
+            self._containers = self._containers + (container,)
+            # Il contenuto principale salva il contorno che lo racchiude
+            self.rescued.update(self._boilerplate)
+        elif not code and self._is_boilerplate(tag, role, attributes):
+            self._flush()
+            boilerplate = self._new_id()
+            self._boilerplate = self._boilerplate + (boilerplate,)
+        self._stack.append((tag, code, boilerplate, container))
+        self._skip += code
+
+        if tag == "a":
+            self._links += 1
+        elif tag in HEADING_TAGS:
+            self._prefix = "#" * HEADING_TAGS[tag] + " "
+        elif tag == "li":
+            self._prefix = "- "
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        # HTML reale: tag non chiusi. Si chiude fino al tag corrispondente, se c'è
+        opened = [i for i, entry in enumerate(self._stack) if entry[0] == tag]
+        if not opened:
+            return
+        # La riga in corso appartiene all'elemento che si chiude (e al suo contorno)
+        closing = self._stack[opened[-1] :]
+        if tag in BLOCK_TAGS or any(entry[2] is not None for entry in closing):
+            self._flush()
+        while self._stack:
+            open_tag, code, boilerplate, container = self._stack.pop()
+            self._skip -= code
+            if boilerplate is not None:
+                self._boilerplate = self._boilerplate[:-1]
+            if container is not None:
+                self._containers = self._containers[:-1]
+            if open_tag == "a":
+                self._links -= 1
+            if open_tag == tag:
+                break
+        if tag == "li" or tag in HEADING_TAGS:
+            self._prefix = ""
+
+    def _new_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    @staticmethod
+    def _is_boilerplate(tag, role, attributes):
+        if tag in SKIP_TAGS or role in SKIP_ROLES:
+            return True
+        if tag in ("html", "body"):
+            return False
+        marker = f"{attributes.get('class') or ''} {attributes.get('id') or ''}"
+        return any(BOILERPLATE_PATTERN.fullmatch(token) for token in marker.split())
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip:
+            return
+        self._parts.append(data)
+        if self._links:
+            self._link_chars += len(data.strip())
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def _select_lines(lines, rescued):
+    """
+    Righe del contenitore principale più ricco di testo; se non c'è (o è
+    troppo povero) tutte le righe, tranne le righe corte fatte solo di link.
+    Le righe di contorno non salvato da un contenitore principale sono scartate.
+    """
+    lines = [
+        line
+        for line in lines
+        if all(boilerplate in rescued for boilerplate in line.boilerplate)
+    ]
+    totals = {}
+    for line in lines:
+        for container in line.containers:
+            totals[container] = totals.get(container, 0) + len(line.text)
+    page_chars = sum(len(line.text) for line in lines)
+    if totals:
+        best, chars = max(totals.items(), key=lambda item: item[1])
+        if chars >= MAIN_MIN_CHARS or chars >= page_chars * MAIN_MIN_SHARE:
+            return [line for line in lines if best in line.containers]
+    return [
+        line
+        for line in lines
+        if line.prefix.startswith("#")
+        or len(line.text) > LINK_LINE_MAX_CHARS
+        or line.link_chars < len(line.text)
+    ]
+
+
+def html_to_text(html, max_chars=None):
+    """
+    Testo leggibile di una pagina HTML: "Title: ..." e poi il contenuto
+    principale, con titoli in stile Markdown e righe duplicate consecutive rimosse.
+    """
+    parser = _TextExtractor()
+    parser.feed(html or "")
+    parser.close()
+
+    output = []
+    title = " ".join(parser.title.split())
+    if title:
+        output.extend([f"Title: {title}", ""])
+    previous = None
+    for line in _select_lines(parser.lines, parser.rescued):
+        text = line.prefix + line.text
+        if text != previous:
+            output.append(text)
+        previous = text
+    text = "\n".join(output)
+    return text[:max_chars] if max_chars else text
@@ -0,0 +1,223 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from requests.structures import CaseInsensitiveDict
+
+import telemetry
+
+# --- CONFIGURAZIONE CACHE HTTP ---
+# Cache su disco delle risposte GitHub / raw README / r.jina.ai, chiave = URL.
+CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".cache", "http_cache.sqlite"
+)
+CACHE_TTL_SECONDS = 60 * 60  # Entro il TTL la risposta viene servita senza rete
+CACHE_MAX_BYTES = 50 * 1024 * 1024  # Oltre questa soglia si elimina in ordine LRU
+# Salviamo anche i 404: i tentativi main/master sui README si ripetono spesso
+CACHEABLE_STATUS = (200, 404)
+
+# Contatore di get_stats() -> etichetta `result` di http_cache_lookups_total
+LOOKUP_RESULTS = {"hits": "hit", "misses": "miss", "revalidated": "revalidated"}
+
+
+class CachedResponse:
+    """
+    Risposta servita dalla cache, con la stessa interfaccia minima di requests
+    usata in utils.py (status_code, text, content, headers, json()).
+    """
+
+    def __init__(self, url, status_code, content, headers, encoding):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers)
+        self.encoding = encoding or "utf-8"
+        self.from_cache = True
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class HTTPCache:
+    """
+    Cache HTTP persistente (SQLite) con TTL, eviction LRU limitata in byte
+    e rivalidazione condizionale (If-None-Match / If-Modified-Since).
+    """
+
+    def __init__(
+        self, path=CACHE_PATH, ttl=CACHE_TTL_SECONDS, max_bytes=CACHE_MAX_BYTES
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                body BLOB NOT NULL,
+                headers TEXT NOT NULL,
+                encoding TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+        # Stessi contatori anche su /metrics (telemetry.py)
+        if name == "evictions":
+            telemetry.metrics.inc("http_cache_evictions_total", amount)
+        else:
+            telemetry.metrics.inc(
+                "http_cache_lookups_total", amount, result=LOOKUP_RESULTS[name]
+            )
+
+    def _lookup(self, url):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT status, body, headers, encoding, etag, last_modified, stored_at "
+                "FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+
+    def _to_response(self, url, row):
+        status, body, headers, encoding = row[0], row[1], row[2], row[3]
+        return CachedResponse(url, status, body, json.loads(headers), encoding)
+
+    def _touch(self, url, refreshed=False):
+        now = time.time()
+        with self._lock:
+            if refreshed:
+                self._conn.execute(
+                    "UPDATE responses SET stored_at = ?, last_access = ? WHERE url = ?",
+                    (now, now, url),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE responses SET last_access = ? WHERE url = ?", (now, url)
+                )
+            self._conn.commit()
+
+    def _store(self, url, response):
+        now = time.time()
+        body = response.content
+        headers = dict(response.headers)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    response.status_code,
+                    body,
+                    json.dumps(headers),
+                    response.encoding,
+                    headers.get("ETag"),
+                    headers.get("Last-Modified"),
+                    now,
+                    now,
+                    len(body),
+                ),
+            )
+            self._conn.commit()
+        self._evict()
+
+    def _evict(self):
+        # Elimina le voci usate meno di recente finché non rientriamo nel limite
+        with self._lock:
+            total = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = self._conn.execute(
+                "SELECT url, size FROM responses ORDER BY last_access ASC"
+            ).fetchall()
+            evicted = 0
+            for url, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                total -= size
+                evicted += 1
+            self._conn.commit()
+        if evicted:
+            self._count("evictions", evicted)
+
+    def fetch(self, send, url, headers=None, **kwargs):
+        """
+        GET con cache: hit entro il TTL, richiesta condizionale oltre il TTL,
+        download completo solo se la risorsa non è in cache o è cambiata.
+        `send(url, headers=..., **kwargs)` esegue la GET di rete (http_client.py).
+        """
+        row = self._lookup(url)
+
+        # 1. Fresca: nessuna chiamata di rete
+        if row is not None and time.time() - row[6] < self.ttl:
+            self._count("hits")
+            self._touch(url)
+            return self._to_response(url, row)
+
+        # 2. Scaduta: rivalidazione condizionale (un 304 non consuma rate limit GitHub)
+        request_headers = dict(headers or {})
+        if row is not None:
+            etag, last_modified = row[4], row[5]
+            if etag:
+                request_headers["If-None-Match"] = etag
+            if last_modified:
+                request_headers["If-Modified-Since"] = last_modified
+
+        response = send(url, headers=request_headers, **kwargs)
+
+        if response.status_code == 304 and row is not None:
+            self._count("revalidated")
+            self._touch(url, refreshed=True)
+            return self._to_response(url, row)
+
+        # 3. Miss: salviamo la nuova risposta
+        self._count("misses")
+        if response.status_code in CACHEABLE_STATUS:
+            self._store(url, response)
+        return response
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Restituisce la cache condivisa del processo (creata alla prima chiamata).
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HTTPCache()
+    return _cache
+
+
+def get_stats():
+    """
+    Contatori hit/miss/revalidated/evictions della cache condivisa.
+    """
+    if _cache is None:
+        return {"hits": 0, "misses": 0, "revalidated": 0, "evictions": 0}
+    return dict(_cache.stats)
@@ -0,0 +1,184 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import http_cache
+import telemetry
+
+# --- CONFIGURAZIONE POOL HTTP ---
+# Una sola Session per processo: le connessioni keep-alive verso lo stesso host
+# (api.github.com, raw.githubusercontent.com, r.jina.ai) vengono riutilizzate
+# invece di rifare handshake TCP/TLS ad ogni chiamata.
+POOL_CONNECTIONS = 8  # Numero di host distinti tenuti in cache
+POOL_MAXSIZE = 16  # Connessioni keep-alive massime per host
+
+# --- LIMITI DI LETTURA ---
+# Ogni risposta viene letta in streaming e mai oltre il budget della chiamata:
+# un link a una pagina enorme o a un binario non costa download e memoria inutili.
+# Content-Type e Content-Length vengono controllati prima di leggere il corpo.
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+READ_CHUNK_SIZE = 16 * 1024
+# Prefissi MIME ammessi (content_types); senza Content-Type la risposta passa
+TEXT_TYPES = (
+    "text/",
+    "application/json",
+    "application/xml",
+    "application/xhtml+xml",
+    "application/graphql-response+json",
+)
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Restituisce la Session HTTP condivisa (creata alla prima chiamata).
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+class PayloadRejected(requests.RequestException):
+    """
+    Risposta scartata senza leggerne (tutto) il corpo: Content-Type non ammesso,
+    oppure corpo oltre il budget quando la troncatura non è consentita.
+    """
+
+
+def _mime_type(response):
+    return response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+
+
+def read_limited(
+    response, max_bytes=DEFAULT_MAX_BYTES, truncate=False, content_types=None
+):
+    """
+    Legge il corpo di una risposta aperta con stream=True, al massimo `max_bytes`
+    (byte decompressi). Oltre il budget: con truncate=True il corpo viene
+    troncato (response.truncated = True), altrimenti PayloadRejected, senza
+    leggere oltre. La connessione torna al pool (o viene chiusa) in ogni caso.
+    """
+    try:
+        mime = _mime_type(response)
+        if content_types and mime and not mime.startswith(content_types):
+            raise PayloadRejected(
+                f"Content-Type non ammesso: {mime}", response=response
+            )
+        length = response.headers.get("Content-Length", "")
+        if not truncate and length.isdigit() and int(length) > max_bytes:
+            raise PayloadRejected(
+                f"Risposta troppo grande: {length} byte (massimo {max_bytes})",
+                response=response,
+            )
+
+        chunks = []
+        size = 0
+        truncated = False
+        for chunk in response.iter_content(chunk_size=READ_CHUNK_SIZE):
+            if size + len(chunk) > max_bytes:
+                chunks.append(chunk[: max_bytes - size])
+                size = max_bytes
+                truncated = True
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+        if truncated and not truncate:
+            raise PayloadRejected(f"Risposta oltre {max_bytes} byte", response=response)
+
+        # Da qui la risposta si usa come una normale (content, text, json())
+        response._content = b"".join(chunks)
+        response._content_consumed = True
+        response.truncated = truncated
+        return response
+    finally:
+        if response._content is False:
+            # Risposta scartata: corpo vuoto, ma status e header restano leggibili
+            response._content = b""
+            response._content_consumed = True
+        response.close()
+
+
+def _bounded(method, max_bytes, truncate, content_types):
+    # Richiesta in streaming sulla Session condivisa, letta con read_limited
+    def send(url, **kwargs):
+        response = method(url, stream=True, **kwargs)
+        return read_limited(response, max_bytes, truncate, content_types)
+
+    return send
+
+
+def get(
+    url,
+    cache=False,
+    max_bytes=DEFAULT_MAX_BYTES,
+    truncate=False,
+    content_types=None,
+    **kwargs,
+):
+    """
+    Wrapper di requests.get che passa dal pool condiviso.
+    Con cache=True la risposta passa dalla cache HTTP su disco (http_cache.py).
+    Il corpo è letto al massimo per `max_bytes` (vedi read_limited).
+    Ogni richiesta è uno span "http.get" (status, byte, hit di cache).
+    """
+    with telemetry.span("http.get", url=url) as stage:
+        send = _bounded(get_session().get, max_bytes, truncate, content_types)
+        response = None
+        try:
+            if cache:
+                try:
+                    cache_store = http_cache.get_cache()
+                except Exception as e:
+                    # Disco non scrivibile o SQLite assente: direttamente in rete
+                    print(f"[HTTP] Cache non disponibile: {e}")
+                else:
+                    response = cache_store.fetch(send, url, **kwargs)
+            if response is None:
+                response = send(url, **kwargs)
+        except PayloadRejected as e:
+            # Anche le risposte scartate contano nelle metriche HTTP
+            telemetry.record_http(e.response)
+            raise
+        if getattr(response, "truncated", False):
+            stage.set(truncated=True)
+        telemetry.record_http(response)
+        return response
+
+
+def head(url, **kwargs):
+    """
+    Wrapper di requests.head sul pool condiviso, con span "http.head".
+    """
+    with telemetry.span("http.head", url=url):
+        response = get_session().head(url, **kwargs)
+        telemetry.record_http(response)
+        return response
+
+
+def post(url, max_bytes=DEFAULT_MAX_BYTES, content_types=None, **kwargs):
+    """
+    Wrapper di requests.post sul pool condiviso (mai in cache), con span "http.post".
+    La risposta non viene mai troncata: oltre `max_bytes` solleva PayloadRejected.
+    """
+    with telemetry.span("http.post", url=url):
+        send = _bounded(get_session().post, max_bytes, False, content_types)
+        try:
+            response = send(url, **kwargs)
+        except PayloadRejected as e:
+            telemetry.record_http(e.response)
+            raise
+        telemetry.record_http(response)
+        return response
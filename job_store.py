@@ -0,0 +1,171 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import telemetry
+
+# --- CONFIGURAZIONE JOB STORE ---
+# Le analisi girano come job su un pool di worker in background, indipendenti
+# dai rerun di Streamlit: ogni rerun ritrova il job (chiave = hash degli input),
+# ne rilegge gli eventi già prodotti e attende solo quelli nuovi.
+JOB_MAX_WORKERS = 4  # Analisi eseguite in parallelo nel processo
+JOB_TTL_SECONDS = 60 * 60  # Job terminati conservati per i rerun successivi
+JOB_MAX_ENTRIES = 256
+POLL_TIMEOUT = 0.5  # Attesa massima di un nuovo evento in follow()
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def job_key(*inputs):
+    """
+    Chiave di un job: hash degli input (stessi input => stesso job).
+    """
+    payload = json.dumps(inputs, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Job:
+    """
+    Stato di un job: eventi prodotti finora (in ordine), esito ed eventuale errore.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.status = QUEUED
+        self.events = []
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._condition = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED)
+
+    def _append(self, event):
+        with self._condition:
+            self.events.append(event)
+            self._condition.notify_all()
+
+    def _finish(self, status, error=None):
+        with self._condition:
+            self.status = status
+            self.error = error
+            self.finished = time.time()
+            self._condition.notify_all()
+
+    def follow(self, start=0, timeout=POLL_TIMEOUT):
+        """
+        Generatore degli eventi dal numero `start` in poi: prima quelli già
+        memorizzati, poi i nuovi appena arrivano, fino alla fine del job.
+        """
+        index = start
+        while True:
+            with self._condition:
+                if index >= len(self.events) and not self.done:
+                    self._condition.wait(timeout)
+                events = self.events[index:]
+                finished = self.done
+            for event in events:
+                yield event
+            index += len(events)
+            if finished and index >= len(self.events):
+                return
+
+
+class JobStore:
+    """
+    Job in memoria per chiave, eseguiti su un pool di thread condiviso.
+    """
+
+    def __init__(
+        self,
+        max_workers=JOB_MAX_WORKERS,
+        ttl=JOB_TTL_SECONDS,
+        max_entries=JOB_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="job"
+        )
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def submit(self, key, func, args=(), kwargs=None, name="job"):
+        """
+        Avvia `func(*args, **kwargs)` (un generatore) come job, salvo che esista
+        già un job per `key` non fallito: in quel caso restituisce quello.
+        Ogni valore prodotto dal generatore diventa un evento del job.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status != FAILED:
+                telemetry.metrics.inc("jobs_total", outcome="deduplicated")
+                return job
+            job = self._jobs[key] = Job(key)
+            self._evict()
+        telemetry.metrics.inc("jobs_total", outcome="submitted")
+        # Il job resta nel trace dello span corrente (telemetry.py)
+        self._executor.submit(
+            telemetry.bind(self._run), job, func, args, kwargs or {}, name
+        )
+        return job
+
+    def discard(self, key):
+        with self._lock:
+            self._jobs.pop(key, None)
+
+    def _run(self, job, func, args, kwargs, name):
+        job.status = RUNNING
+        with telemetry.span(name, job=job.key[:12]) as stage:
+            try:
+                for event in func(*args, **kwargs):
+                    job._append(event)
+            except Exception as e:
+                stage.fail(e)
+                print(f"[JOBS] Job {job.key[:12]} fallito: {e}")
+                job._finish(FAILED, str(e))
+                return
+        job._finish(DONE)
+
+    def _evict(self):
+        # Chiamata con il lock: prima i job terminati e scaduti, poi i più vecchi
+        now = time.time()
+        for key in [
+            key
+            for key, job in self._jobs.items()
+            if job.done and now - job.finished > self.ttl
+        ]:
+            del self._jobs[key]
+        for key in list(self._jobs):
+            if len(self._jobs) <= self.max_entries:
+                break
+            if self._jobs[key].done:
+                del self._jobs[key]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    Restituisce il job store del processo (condiviso tra sessioni e rerun).
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = JobStore()
+    return _store
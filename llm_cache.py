@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import telemetry
+
+# --- CONFIGURAZIONE CACHE LLM ---
+# Cache content-addressed dei risultati LLM: stessi input => stessa risposta,
+# senza chiamare OpenRouter (demo, retry, QA).
+CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".cache", "llm_cache.sqlite"
+)
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60  # Oltre il TTL la voce viene rigenerata
+CACHE_MAX_ENTRIES = 2000  # Oltre questa soglia si elimina in ordine LRU
+
+
+def normalize_prompt(text):
+    """
+    Normalizza il prompt utente: spazi multipli e indentazione non cambiano la chiave.
+    """
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def make_key(model, system_prompt, user_prompt, temperature=None):
+    """
+    Hash SHA-256 di modello, system prompt, prompt utente normalizzato e temperatura.
+    """
+    payload = json.dumps(
+        [model, system_prompt.strip(), normalize_prompt(user_prompt), temperature]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Cache persistente (SQLite) dei risultati LLM con TTL ed eviction LRU.
+    I valori sono stringhe JSON (es. CTSAnalysis.model_dump_json()).
+    """
+
+    def __init__(
+        self, path=CACHE_PATH, ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        """
+        Restituisce il payload JSON in cache oppure None (miss o scaduto).
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, stored_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                self.stats["misses"] += 1
+                payload = None
+            else:
+                self._conn.execute(
+                    "UPDATE results SET last_access = ? WHERE key = ?", (now, key)
+                )
+                self._conn.commit()
+                self.stats["hits"] += 1
+                payload = row[0]
+        # Stessi contatori anche su /metrics (telemetry.py)
+        telemetry.metrics.inc(
+            "llm_cache_lookups_total", result="miss" if payload is None else "hit"
+        )
+        return payload
+
+    def set(self, key, payload):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (key, payload, now, now),
+            )
+            # Eviction: via le voci scadute, poi le meno usate oltre max_entries
+            expired = self._conn.execute(
+                "DELETE FROM results WHERE stored_at < ?", (now - self.ttl,)
+            ).rowcount
+            overflow = self._conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                "SELECT key FROM results ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            self._conn.commit()
+            self.stats["evictions"] += expired + overflow
+        if expired + overflow:
+            telemetry.metrics.inc("llm_cache_evictions_total", expired + overflow)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Restituisce la cache LLM condivisa del processo (creata alla prima chiamata).
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
+
+
+def lookup(key):
+    """
+    Lettura tollerante: se la cache non è disponibile si comporta come un miss.
+    """
+    try:
+        return get_cache().get(key)
+    except Exception as e:
+        print(f"[LLM CACHE] Lettura fallita: {e}")
+        return None
+
+
+def store(key, payload):
+    try:
+        get_cache().set(key, payload)
+    except Exception as e:
+        print(f"[LLM CACHE] Scrittura fallita: {e}")
+
+
+def get_stats():
+    """
+    Contatori hit/miss/evictions della cache condivisa.
+    """
+    if _cache is None:
+        return {"hits": 0, "misses": 0, "evictions": 0}
+    return dict(_cache.stats)
@@ -0,0 +1,100 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import settings
+
+# --- CONFIGURAZIONE CLIENT CONDIVISO ---
+# Un solo client OpenAI per processo (engine.py e logic.py): pool di connessioni
+# keep-alive verso OpenRouter, niente handshake TLS sul percorso critico.
+# openai e streamlit vengono importati al primo uso: importare questo modulo
+# (engine, logic, batch) non costa quasi nulla.
+OPENROUTER_BASE_URL = os.environ.get(
+    "OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"
+)
+MAX_CONNECTIONS = 32
+MAX_KEEPALIVE_CONNECTIONS = 16
+KEEPALIVE_EXPIRY = 120  # Secondi prima di chiudere una connessione inattiva
+REQUEST_TIMEOUT = 120
+WARMUP_CONNECTIONS = 2  # Connessioni aperte in anticipo da warm_up()
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _http2_enabled():
+    # HTTP/2 opzionale: richiede il pacchetto h2
+    if not settings.get_flag("OPENROUTER_HTTP2"):
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        print("[LLM CLIENT] OPENROUTER_HTTP2 attivo ma 'h2' non è installato.")
+        return False
+    return True
+
+
+def _build_http_client():
+    try:
+        import httpx
+        from openai import DefaultHttpxClient
+    except ImportError:
+        return None
+
+    return DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=REQUEST_TIMEOUT,
+        http2=_http2_enabled(),
+    )
+
+
+def get_client():
+    """
+    Restituisce il client OpenAI condiviso, creandolo alla prima chiamata.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # Recupera la chiave dai Secrets (Protetto per deploy)
+                api_key = settings.get_setting("OPENROUTER_API_KEY")
+                if not api_key:
+                    print("[LLM CLIENT] Nessuna API Key OpenRouter nei secrets.")
+                    raise ValueError("API Key mancante.")
+
+                from openai import OpenAI
+
+                _client = OpenAI(
+                    base_url=OPENROUTER_BASE_URL,
+                    api_key=api_key,
+                    http_client=_build_http_client(),
+                )
+                print("[LLM CLIENT] MODALITÀ PROD: OpenRouter connesso.")
+    return _client
+
+
+def warm_up(connections=WARMUP_CONNECTIONS):
+    """
+    Apre in anticipo connessioni TLS verso OpenRouter con una richiesta leggera,
+    così la prima analisi trova il pool già caldo. Gli errori vengono ignorati.
+    """
+    try:
+        client = get_client().with_options(max_retries=0, timeout=10)
+    except Exception as e:
+        print(f"[LLM CLIENT] Warm-up saltato: {e}")
+        return
+
+    def ping(_):
+        try:
+            client.get("/key", cast_to=object)
+        except Exception:
+            # Anche un 401/404 lascia la connessione aperta nel pool
+            pass
+
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        list(executor.map(ping, range(connections)))
+    print(f"[LLM CLIENT] Warm-up completato ({connections} connessioni).")
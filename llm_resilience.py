@@ -0,0 +1,229 @@
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import llm_client
+import settings
+import telemetry
+
+# --- CONFIGURAZIONE RESILIENZA LLM ---
+# Retry con backoff esponenziale + jitter sugli errori transitori, richiesta
+# "hedged" opzionale (una seconda richiesta se la prima tarda) e fallback su un
+# modello secondario quando il primario continua a fallire.
+MAX_ATTEMPTS = 3  # Tentativi per modello
+BACKOFF_BASE = 0.5  # Secondi, raddoppia ad ogni tentativo
+BACKOFF_MAX = 8.0
+RETRY_AFTER_MAX = 20.0  # Tetto all'header Retry-After dei 429
+ATTEMPT_TIMEOUT = 60  # Timeout di rete del singolo tentativo
+# Secrets / variabili d'ambiente lette al momento della chiamata:
+#   LLM_HEDGE_AFTER     secondi prima della richiesta di riserva (vuoto = no hedging)
+#   LLM_FALLBACK_MODEL  modello secondario (vuoto = nessun fallback)
+HEDGE_MAX_WORKERS = 16
+
+# Classi di errore del pacchetto openai, per nome: openai viene importato solo
+# quando serve (vedi llm_client.py)
+# Transitori: rete, timeout, rate limit, errori 5xx del provider
+RETRYABLE_ERRORS = (
+    "APIConnectionError",  # Include APITimeoutError
+    "RateLimitError",
+    "InternalServerError",
+    "ConflictError",
+)
+# Il modello non accetta la richiesta: inutile riprovare, si passa al fallback
+MODEL_ERRORS = ("NotFoundError", "BadRequestError", "UnprocessableEntityError")
+
+_hedge_pool = None
+_hedge_lock = threading.Lock()
+
+
+def _is_openai_error(error, names):
+    import openai
+
+    return isinstance(error, tuple(getattr(openai, name) for name in names))
+
+
+def is_retryable(error):
+    if _is_openai_error(error, RETRYABLE_ERRORS):
+        return True
+    # Gateway e proxy davanti a OpenRouter (502/503/504, 408)
+    status = getattr(error, "status_code", None)
+    return status is not None and (status == 408 or status >= 500)
+
+
+def backoff_delay(attempt, error=None):
+    """
+    Attesa prima del tentativo successivo: "full jitter" sul backoff esponenziale,
+    oppure il Retry-After indicato dal server (limitato a RETRY_AFTER_MAX).
+    """
+    response = getattr(error, "response", None)
+    retry_after = None
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_AFTER_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+def hedge_after():
+    value = settings.get_setting("LLM_HEDGE_AFTER")
+    return float(value) if value else None
+
+
+def model_chain(model):
+    fallback = settings.get_setting("LLM_FALLBACK_MODEL")
+    if fallback and fallback != model:
+        return [model, fallback]
+    return [model]
+
+
+def get_client():
+    # I retry li gestiamo qui: niente retry interni del client OpenAI
+    return llm_client.get_client().with_options(
+        max_retries=0, timeout=ATTEMPT_TIMEOUT
+    )
+
+
+class RetryPlan:
+    """
+    Sequenza di tentativi (modello, numero) per una chiamata LLM:
+
+        plan = RetryPlan(model)
+        for model, attempt in plan:
+            try:
+                response = ...
+            except Exception as e:
+                plan.failed(model, attempt, e)  # attende, o rilancia se fatale
+                continue
+            plan.succeeded(model, attempt)
+            return response
+        raise plan.last_error
+
+    Tentativi ed esito finiscono sullo span corrente e nelle metriche.
+    """
+
+    def __init__(self, model, max_attempts=MAX_ATTEMPTS, span=None):
+        self.models = model_chain(model)
+        self.max_attempts = max_attempts
+        self.history = []
+        self.last_error = None
+        self._span = span or telemetry.current_span()
+        self._next_model = False
+
+    def __iter__(self):
+        for model in self.models:
+            self._next_model = False
+            for attempt in range(1, self.max_attempts + 1):
+                yield model, attempt
+                if self._next_model:
+                    break
+
+    def _record(self, model, attempt, outcome):
+        self.history.append(f"{model}#{attempt}:{outcome}")
+        telemetry.metrics.inc("llm_attempts_total", model=model, outcome=outcome)
+        if self._span is not None:
+            self._span.set(attempts=list(self.history))
+
+    def failed(self, model, attempt, error):
+        """
+        Registra un tentativo fallito. Errori transitori: attesa con backoff e
+        nuovo tentativo. Errori del modello: si passa al fallback. Altri errori
+        (chiave mancante, 401/403...) vengono rilanciati subito.
+        """
+        self.last_error = error
+        if is_retryable(error):
+            self._record(model, attempt, "retryable_error")
+            if attempt < self.max_attempts:
+                delay = backoff_delay(attempt, error)
+                print(
+                    f"[LLM RETRY] {model} tentativo {attempt} fallito ({error}), "
+                    f"riprovo tra {delay:.2f}s"
+                )
+                time.sleep(delay)
+            return
+        if _is_openai_error(error, MODEL_ERRORS):
+            self._record(model, attempt, "model_error")
+            self._next_model = True
+            return
+        self._record(model, attempt, "fatal_error")
+        raise error
+
+    def succeeded(self, model, attempt, path="primary"):
+        self._record(model, attempt, f"ok_{path}")
+        if self._span is not None:
+            self._span.set(
+                winner=f"{model}#{attempt}/{path}", fallback=model != self.models[0]
+            )
+
+
+def used_fallback(span):
+    """
+    True se la chiamata registrata su `span` è stata servita dal modello di
+    fallback (RetryPlan.succeeded lo segna sullo span). Quel risultato non va
+    in cache sotto la chiave del modello primario.
+    """
+    return bool(span is not None and span.attributes.get("fallback"))
+
+
+def _get_hedge_pool():
+    global _hedge_pool
+    if _hedge_pool is None:
+        with _hedge_lock:
+            if _hedge_pool is None:
+                _hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS)
+    return _hedge_pool
+
+
+def _hedged(request, client, model, delay):
+    """
+    Lancia `request`; se dopo `delay` secondi non ha risposto, lancia una
+    seconda richiesta identica e restituisce (risposta, percorso) della prima
+    che va a buon fine. La richiesta perdente finisce in background.
+    """
+    pool = _get_hedge_pool()
+    call = telemetry.bind(request)
+    primary = pool.submit(call, client, model)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result(), "primary"
+
+    hedge = pool.submit(call, client, model)
+    paths = {primary: "primary", hedge: "hedge"}
+    pending = set(paths)
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                telemetry.metrics.inc("llm_hedges_total", winner=paths[future])
+                return future.result(), paths[future]
+            error = future.exception()
+    telemetry.metrics.inc("llm_hedges_total", winner="none")
+    raise error
+
+
+def call(request, model, hedge=True):
+    """
+    Esegue `request(client, model)` con retry, hedging e fallback di modello.
+    Con hedge=False niente richiesta di riserva (es. streaming).
+    Restituisce la risposta del primo tentativo riuscito; se tutti falliscono
+    rilancia l'ultimo errore (i chiamanti lo gestiscono come prima).
+    """
+    client = get_client()
+    delay = hedge_after() if hedge else None
+    plan = RetryPlan(model)
+    for current, attempt in plan:
+        try:
+            if delay:
+                response, path = _hedged(request, client, current, delay)
+            else:
+                response, path = request(client, current), "primary"
+        except Exception as e:
+            plan.failed(current, attempt, e)
+            continue
+        plan.succeeded(current, attempt, path)
+        return response
+    raise plan.last_error
@@ -1,34 +1,22 @@
-import streamlit as st
-from openai import OpenAI
 import json
 
-# --- CONFIGURAZIONE MOTORE ---
-# Recuperiamo la chiave dai Secrets (Protetto per deploy)
-try:
-    api_key = st.secrets["OPENROUTER_API_KEY"]
-    base_url = "https://openrouter.ai/api/v1"
-
-    client = OpenAI(base_url=base_url, api_key=api_key)
-    # Prefisso openai/ richiesto da OpenRouter per questo modello
-    MODEL_NAME = "openai/gpt-4o-mini"
-    print("MODALITÀ PROD: OpenRouter connesso su gpt-4o-mini")
+import llm_cache
+import llm_resilience
+import single_flight
+import telemetry
 
-except Exception as e:
-    client = None
-    MODEL_NAME = "openai/gpt-4o-mini"
-    print(f"Errore configurazione Client: {e}")
+# --- CONFIGURAZIONE MOTORE ---
+# Il client OpenRouter è condiviso con engine.py e creato al primo uso (llm_client.py)
+# Prefisso openai/ richiesto da OpenRouter per questo modello
+MODEL_NAME = "openai/gpt-4o-mini"
 
+# Stesso testo in analisi da più sessioni: una sola chiamata (single_flight.py)
+_llm_flight = single_flight.group("llm")
 
-# --- 2. LA FUNZIONE PRINCIPALE ---
-def get_archetype_analysis(user_text):
-    """
-    Prende il testo grezzo dell'utente e restituisce un dizionario Python (JSON)
-    con l'analisi dell'archetipo.
-    """
 
-    # SYSTEM PROMPT: Le istruzioni per l'AI
-    # Nota: Dobbiamo essere molto specifici sul JSON per evitare errori
-    system_prompt = """
+# SYSTEM PROMPT: Le istruzioni per l'AI
+# Nota: Dobbiamo essere molto specifici sul JSON per evitare errori
+SYSTEM_PROMPT = """
     Sei "The Potentiality Engine", un'AI che analizza profili professionali.
     NON guardare ai Job Title. Guarda ai pattern di pensiero, ai fallimenti e alle ambizioni.
     
@@ -46,18 +34,57 @@ def get_archetype_analysis(user_text):
     }
     """
 
+
+# --- 2. LA FUNZIONE PRINCIPALE ---
+def get_archetype_analysis(user_text, use_cache=True):
+    """
+    Prende il testo grezzo dell'utente e restituisce un dizionario Python (JSON)
+    con l'analisi dell'archetipo.
+    Con use_cache=False la cache LLM viene ignorata (forza una nuova analisi).
+    """
+    with telemetry.span("llm.archetype", model=MODEL_NAME) as stage:
+        result = _llm_flight.do(
+            ("archetype", user_text, use_cache),
+            _archetype_analysis,
+            user_text,
+            use_cache,
+            stage,
+        )
+        if isinstance(result, dict) and "error" in result:
+            stage.fail(result["error"])
+        return result
+
+
+def _archetype_analysis(user_text, use_cache, stage):
+    system_prompt = SYSTEM_PROMPT
+    user_prompt = f"Analizza questi dati: {user_text}"
+    temperature = 0.7  # Creatività bilanciata
+
+    # Cache content-addressed: input identici => stesso archetipo, zero rete
+    cache_key = llm_cache.make_key(MODEL_NAME, system_prompt, user_prompt, temperature)
+    if use_cache:
+        cached = llm_cache.lookup(cache_key)
+        if cached is not None:
+            stage.set(cache="hit")
+            return json.loads(cached)
+    stage.set(cache="miss")
+
     try:
-        # Chiamata all'API
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Analizza questi dati: {user_text}"},
-            ],
-            temperature=0.7,  # Creatività bilanciata
-            # response_format={"type": "json_object"} # Abilitalo solo con GPT-4/3.5, Ollama a volte crasha con questo
+        # Chiamata all'API (retry, hedging e fallback di modello: llm_resilience.py)
+        response = llm_resilience.call(
+            lambda client, model: client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                temperature=temperature,
+                # response_format={"type": "json_object"} # Abilitalo solo con GPT-4/3.5, Ollama a volte crasha con questo
+            ),
+            MODEL_NAME,
         )
 
+        telemetry.record_usage(response.usage, response.model, stage)
         content = response.choices[0].message.content
 
         # --- 3. PULIZIA DATI (HACK PER OLLAMA) ---
@@ -73,6 +100,9 @@ def get_archetype_analysis(user_text):
 
         # Parsing finale
         data = json.loads(json_str)
+        # In cache solo i risultati validi del modello richiesto, mai gli errori
+        if isinstance(data, dict) and not llm_resilience.used_fallback(stage):
+            llm_cache.store(cache_key, json.dumps(data))
         return data
 
     except json.JSONDecodeError:
@@ -0,0 +1,161 @@
+import queue
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import engine
+import logic
+import telemetry
+import utils
+
+# Risultato di uno stadio: nome, valore restituito e durata in secondi
+StageResult = namedtuple("StageResult", ["name", "result", "elapsed"])
+
+# Intervallo di polling per inoltrare i campi parziali dello streaming
+POLL_INTERVAL = 0.05
+
+# Etichette per il pannello st.status in app.py
+STAGE_LABELS = {
+    "github": "GitHub DNA acquisito",
+    "web": "Web & Creative DNA acquisito",
+    "archetype": "Archetipo Visionario identificato",
+    "trajectory": "Traiettorie Future simulate",
+}
+
+
+def _timed(name, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return StageResult(name, result, time.perf_counter() - start)
+
+
+def _stream_trajectory(events, cv_text, personality_text, github_data, web_data):
+    # Inoltra ogni campo completo come stadio parziale, poi il risultato finale
+    start = time.perf_counter()
+    result = None
+    for field, value in engine.stream_trajectory_simulation(
+        cv_text, personality_text, github_data, web_data
+    ):
+        if field == "complete":
+            result = value
+        else:
+            elapsed = time.perf_counter() - start
+            events.put(StageResult("trajectory_partial", (field, value), elapsed))
+    return StageResult("trajectory", result, time.perf_counter() - start)
+
+
+def _split_combined(stage):
+    # Un solo risultato combinato alimenta entrambe le sezioni della UI
+    result = stage.result
+    if result is None:
+        archetype = {"error": "Errore nella generazione combinata."}
+    else:
+        archetype = result.archetype.model_dump()
+    return [
+        StageResult("archetype", archetype, stage.elapsed),
+        StageResult("trajectory", result, stage.elapsed),
+    ]
+
+
+def run_analysis(
+    cv_text,
+    personality_text,
+    github_user,
+    web_links,
+    stream=True,
+    combined=False,
+    prefetched=None,
+):
+    """
+    Orchestratore dell'analisi: avvia in parallelo gli stadi indipendenti
+    (GitHub, Web, Archetipo) e lancia la simulazione delle traiettorie appena
+    GitHub e Web sono pronti.
+
+    È un generatore: restituisce uno StageResult per ogni stadio nell'ordine
+    in cui terminano, così il chiamante (thread di Streamlit) può aggiornare
+    la UI man mano. Le chiamate st.* restano tutte nel thread dello script.
+
+    Con stream=True le traiettorie arrivano in streaming: ogni campo completo
+    (core_vector, poi le singole Trajectory) viene restituito come stadio
+    "trajectory_partial" con valore (campo, valore), prima di "trajectory".
+
+    Con combined=True archetipo e traiettorie arrivano da un'unica chiamata LLM
+    (engine.generate_combined_analysis) dopo GitHub e Web; gli stadi restituiti
+    restano "archetype" e "trajectory", quindi la UI non cambia.
+
+    `prefetched` ({url: body}) passa a get_web_dna le pagine già scaricate
+    durante la validazione dei link.
+    """
+    events = queue.Queue()
+    with ThreadPoolExecutor(max_workers=len(STAGE_LABELS)) as executor:
+
+        def submit(func, *args):
+            # Gli stadi restano figli dello span del chiamante (telemetry.py)
+            return executor.submit(telemetry.bind(func), *args)
+
+        pending = {
+            submit(_timed, "github", utils.get_github_dna, github_user),
+            submit(_timed, "web", utils.get_web_dna, web_links, prefetched),
+        }
+        if not combined:
+            pending.add(
+                submit(
+                    _timed,
+                    "archetype",
+                    logic.get_archetype_analysis,
+                    personality_text + " " + cv_text,
+                )
+            )
+        results = {}
+        trajectory_started = False
+
+        while pending:
+            done, pending = wait(
+                pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED
+            )
+            # Prima i parziali, così arrivano sempre prima del risultato finale
+            while not events.empty():
+                yield events.get()
+            for future in done:
+                stage = future.result()
+                if stage.name == "combined":
+                    stages = _split_combined(stage)
+                else:
+                    stages = [stage]
+                for stage in stages:
+                    results[stage.name] = stage.result
+                    yield stage
+
+            # Le traiettorie dipendono solo dai dati di arricchimento
+            if not trajectory_started and "github" in results and "web" in results:
+                if combined:
+                    future = submit(
+                        _timed,
+                        "combined",
+                        engine.generate_combined_analysis,
+                        cv_text,
+                        personality_text,
+                        results["github"],
+                        results["web"],
+                    )
+                elif stream:
+                    future = submit(
+                        _stream_trajectory,
+                        events,
+                        cv_text,
+                        personality_text,
+                        results["github"],
+                        results["web"],
+                    )
+                else:
+                    future = submit(
+                        _timed,
+                        "trajectory",
+                        engine.generate_trajectory_simulation,
+                        cv_text,
+                        personality_text,
+                        results["github"],
+                        results["web"],
+                    )
+                pending.add(future)
+                trajectory_started = True
@@ -0,0 +1,237 @@
+import hashlib
+import re
+import threading
+import time
+
+import llm_cache
+import settings
+import telemetry
+
+# --- CONFIGURAZIONE CACHE SEMANTICA ---
+# CV quasi identici (template, ricaricamenti con un refuso corretto, stesso testo
+# di bootcamp) mancano la cache esatta di llm_cache.py. Qui ogni CV diventa un
+# vettore di n-grammi di caratteri "hashed" (NumPy): se un CV già analizzato ha
+# similarità coseno sopra la soglia, si riusa il suo risultato senza chiamare l'LLM.
+# Le altre sorgenti (personalità, GitHub, web) non sono confrontate per
+# similarità: entrano nel namespace e devono coincidere esattamente.
+# L'indice tiene solo vettori e chiavi: i risultati restano nella cache LLM.
+SEMANTIC_DIMENSIONS = 4096  # Dimensione del vettore (bucket degli n-grammi)
+SEMANTIC_NGRAM_SIZES = (3, 5)  # n-grammi di caratteri
+SEMANTIC_MAX_ENTRIES = 1024  # Oltre questa soglia si elimina in ordine LRU
+# Secrets / variabili d'ambiente lette al momento della ricerca:
+#   SEMANTIC_CACHE_THRESHOLD  similarità minima (default sotto; > 1 disattiva)
+SEMANTIC_THRESHOLD = 0.97
+
+STAT_NAMES = ("hits", "misses", "stale", "evictions")
+
+# Moltiplicatore dell'hash polinomiale degli n-grammi (primo a 31 bit)
+_HASH_BASE = 1_000_003
+
+
+def get_threshold():
+    value = settings.get_setting("SEMANTIC_CACHE_THRESHOLD")
+    try:
+        return float(value) if value else SEMANTIC_THRESHOLD
+    except ValueError:
+        print(f"[SEMANTIC CACHE] Soglia non valida: {value!r}, uso il default")
+        return SEMANTIC_THRESHOLD
+
+
+def namespace(*parts):
+    """
+    Spazio di ricerca: le parti (modello, system prompt, sorgenti non
+    confrontate per similarità) devono coincidere esattamente.
+    """
+    payload = "\x1f".join(str(part).strip() for part in parts)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def embed(text, dimensions=SEMANTIC_DIMENSIONS):
+    """
+    Vettore L2-normalizzato degli n-grammi di caratteri del testo normalizzato
+    (minuscolo, spazi compattati). Gli n-grammi sono calcolati con un hash
+    polinomiale vettorizzato, stabile tra processi (niente hash() di Python).
+    """
+    import numpy as np
+
+    normalized = re.sub(r"\s+", " ", (text or "").lower()).strip()
+    codes = np.frombuffer(normalized.encode("utf-8"), dtype=np.uint8).astype(
+        np.uint64
+    )
+    counts = np.zeros(dimensions, dtype=np.float32)
+    for size in SEMANTIC_NGRAM_SIZES:
+        if len(codes) < size:
+            continue
+        hashes = np.zeros(len(codes) - size + 1, dtype=np.uint64)
+        for offset in range(size):
+            # uint64: l'overflow è un modulo 2**64, voluto
+            window = codes[offset : offset + len(hashes)]
+            hashes = hashes * np.uint64(_HASH_BASE) + window
+        counts += np.bincount(
+            (hashes % np.uint64(dimensions)).astype(np.int64), minlength=dimensions
+        ).astype(np.float32)
+    # Smorzamento: un n-gramma ripetuto cento volte non domina il vettore
+    vector = np.sqrt(counts)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticIndex:
+    """
+    Indice in memoria (vettori NumPy) dei testi già analizzati, con ricerca per
+    similarità coseno ed eviction LRU. Ogni voce punta alla chiave esatta della
+    cache LLM che contiene il risultato.
+    """
+
+    def __init__(
+        self, max_entries=SEMANTIC_MAX_ENTRIES, dimensions=SEMANTIC_DIMENSIONS
+    ):
+        import numpy as np
+
+        self.max_entries = max_entries
+        self.dimensions = dimensions
+        self.stats = dict.fromkeys(STAT_NAMES, 0)
+        self._vectors = np.zeros((max_entries, dimensions), dtype=np.float32)
+        # Namespace di ogni riga come intero: il filtro resta un confronto vettoriale
+        self._spaces = np.full(max_entries, -1, dtype=np.int64)
+        self._space_ids = {}
+        self._keys = [None] * max_entries
+        self._last_access = np.zeros(max_entries, dtype=np.float64)
+        self._slots = {}  # chiave cache LLM -> riga
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def search(self, space, vector, threshold):
+        """
+        Voce più simile nello stesso namespace: (chiave, similarità) oppure
+        (None, similarità migliore) se sotto la soglia.
+        """
+        import numpy as np
+
+        with self._lock:
+            space_id = self._space_ids.get(space)
+            used = len(self._slots)
+            if space_id is None or not used:
+                return None, 0.0
+            # Le righe occupate sono sempre 0..n-1: prodotto senza copie
+            scores = self._vectors[:used] @ vector
+            scores[self._spaces[:used] != space_id] = -1.0
+            row = int(np.argmax(scores))
+            similarity = float(scores[row])
+            if similarity < threshold:
+                return None, max(similarity, 0.0)
+            self._last_access[row] = time.time()
+            return self._keys[row], similarity
+
+    def count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def add(self, space, vector, key):
+        with self._lock:
+            row = self._slots.get(key)
+            if row is None:
+                if len(self._slots) < self.max_entries:
+                    row = len(self._slots)
+                else:
+                    # Riga usata meno di recente: con l'indice pieno tutte sono occupate
+                    row = int(self._last_access.argmin())
+                    del self._slots[self._keys[row]]
+                    self.stats["evictions"] += 1
+                self._slots[key] = row
+            self._vectors[row] = vector
+            self._spaces[row] = self._space_ids.setdefault(space, len(self._space_ids))
+            self._keys[row] = key
+            self._last_access[row] = time.time()
+
+    def remove(self, key):
+        # La riga liberata prende l'ultima, così le righe occupate restano 0..n-1
+        with self._lock:
+            row = self._slots.pop(key, None)
+            if row is None:
+                return
+            last = len(self._slots)
+            if row != last:
+                moved = self._keys[last]
+                self._vectors[row] = self._vectors[last]
+                self._spaces[row] = self._spaces[last]
+                self._keys[row] = moved
+                self._last_access[row] = self._last_access[last]
+                self._slots[moved] = row
+            self._spaces[last] = -1
+            self._keys[last] = None
+            self._last_access[last] = 0.0
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Restituisce l'indice semantico condiviso del processo (creato alla prima chiamata).
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SemanticIndex()
+    return _index
+
+
+def lookup(space, text, stage=None):
+    """
+    Payload JSON del risultato di un testo quasi identico, oppure None.
+    Tollerante come llm_cache.lookup: un errore vale come miss.
+    """
+    threshold = get_threshold()
+    if threshold > 1:
+        return None
+    try:
+        index = get_index()
+        key, similarity = index.search(space, embed(text, index.dimensions), threshold)
+        payload = llm_cache.lookup(key) if key is not None else None
+    except Exception as e:
+        print(f"[SEMANTIC CACHE] Ricerca fallita: {e}")
+        return None
+
+    if key is not None and payload is None:
+        # Risultato scaduto o eliminato dalla cache LLM: la voce non serve più
+        index.remove(key)
+        outcome, stat = "stale", "stale"
+    elif payload is None:
+        outcome, stat = "miss", "misses"
+    else:
+        outcome, stat = "hit", "hits"
+    index.count(stat)
+    telemetry.metrics.inc("semantic_cache_lookups_total", result=outcome)
+    if stage is not None:
+        stage.set(similarity=round(similarity, 4))
+    return payload
+
+
+def remember(space, text, key):
+    """
+    Indicizza un testo appena analizzato (il risultato è già in cache LLM con `key`).
+    """
+    try:
+        index = get_index()
+        index.add(space, embed(text, index.dimensions), key)
+    except Exception as e:
+        print(f"[SEMANTIC CACHE] Indicizzazione fallita: {e}")
+
+
+def get_stats():
+    """
+    Contatori dell'indice condiviso, con hit rate sulle ricerche.
+    """
+    if _index is None:
+        stats = dict.fromkeys(STAT_NAMES, 0)
+    else:
+        stats = dict(_index.stats)
+    lookups = stats["hits"] + stats["misses"] + stats["stale"]
+    stats["entries"] = len(_index) if _index is not None else 0
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
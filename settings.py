@@ -0,0 +1,35 @@
+import os
+
+# --- CONFIGURAZIONE (SECRETS / AMBIENTE) ---
+# Un solo punto di lettura delle impostazioni per tutti i moduli: prima i Secrets
+# di Streamlit (.streamlit/secrets.toml in locale, Secrets in deploy), poi le
+# variabili d'ambiente (batch_runner, CLI, benchmark). streamlit viene importato
+# al primo uso: importare questo modulo non costa quasi nulla.
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+def get_setting(name, default=None):
+    """
+    Valore di un'impostazione: Secrets di Streamlit, poi variabile d'ambiente,
+    poi `default`. Fuori da Streamlit (o senza secrets.toml) vale solo l'ambiente.
+    """
+    try:
+        import streamlit as st
+
+        value = st.secrets.get(name)
+    except Exception:
+        value = None
+    if value is None:
+        value = os.environ.get(name, default)
+    return value
+
+
+def get_flag(name, default=False):
+    """
+    Flag booleano: True per "1", "true", "yes", "on" (anche come booleano TOML),
+    False per qualunque altro valore; `default` se l'impostazione manca.
+    """
+    value = get_setting(name)
+    if value is None:
+        return default
+    return str(value).strip().lower() in TRUE_VALUES
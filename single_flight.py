@@ -0,0 +1,96 @@
+import threading
+
+import telemetry
+
+# --- CONFIGURAZIONE SINGLE-FLIGHT ---
+# Più sessioni che chiedono la stessa cosa nello stesso momento (una classe che
+# analizza lo stesso profilo GitHub, lo stesso portfolio, lo stesso prompt LLM)
+# condividono un'unica esecuzione: la prima chiamata per una chiave esegue,
+# le altre attendono e ricevono lo stesso risultato (o la stessa eccezione).
+# Le chiamate già concluse non vengono ricordate: per quello ci sono le cache.
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Group:
+    """
+    Gruppo di chiamate deduplicate per chiave:
+
+        github_flight = single_flight.group("github")
+        github_flight.do(username, fetch_profile, username)
+
+    Contatori: single_flight_calls_total{group, outcome=executed|coalesced}.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.stats = {"executed": 0, "coalesced": 0}
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self.stats["executed" if leader else "coalesced"] += 1
+        telemetry.metrics.inc(
+            "single_flight_calls_total",
+            group=self.name,
+            outcome="executed" if leader else "coalesced",
+        )
+
+        if not leader:
+            stage = telemetry.current_span()
+            if stage is not None:
+                stage.set(coalesced=True)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Prima si libera la chiave, poi si svegliano le attese: una chiamata
+            # successiva al risultato riparte da capo (o dalla cache)
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def group(name):
+    """
+    Restituisce il gruppo `name` del processo (creato alla prima chiamata).
+    """
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = Group(name)
+        return _groups[name]
+
+
+def get_stats():
+    """
+    Chiamate eseguite e accodate per gruppo.
+    """
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {flight.name: dict(flight.stats) for flight in groups}
@@ -0,0 +1,324 @@
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# --- CONFIGURAZIONE TELEMETRIA ---
+# Ogni stadio (PDF, GitHub, jina, validazione link, chiamate LLM) apre uno span:
+# durata, byte scaricati, status HTTP e token LLM finiscono in un log JSON
+# (una riga per span) e nelle metriche in formato Prometheus.
+# TELEMETRY_LOG: "stderr" (default), "off" oppure il percorso di un file JSONL.
+TELEMETRY_LOG = os.environ.get("TELEMETRY_LOG", "stderr")
+METRICS_PREFIX = "antiportfolio"
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+# Bucket (secondi) degli istogrammi di durata: da pochi ms alle chiamate LLM lente
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+# Host con etichetta propria nelle metriche HTTP. Portfolio e link arrivano dagli
+# utenti: finiscono tutti in "other", così il numero di serie resta limitato
+METRICS_HOSTS = frozenset(
+    ("api.github.com", "raw.githubusercontent.com", "r.jina.ai", "openrouter.ai")
+)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_log_lock = threading.Lock()
+_log_file = None
+
+
+class Span:
+    """
+    Misura di uno stadio. I contatori in ROLLUP_ATTRIBUTES (byte dalla rete e
+    dalla cache, token LLM) vengono sommati anche sullo span padre alla chiusura,
+    così lo stadio riporta il totale delle sue richieste HTTP / LLM.
+    """
+
+    ROLLUP_ATTRIBUTES = ("bytes", "cached_bytes", "prompt_tokens", "completion_tokens")
+
+    def __init__(self, name, parent=None, **attributes):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attributes = attributes
+        self.status = "ok"
+        self.error = None
+        self.start = time.perf_counter()
+        self.timestamp = time.time()
+        self.duration = None
+        self._lock = threading.Lock()
+
+    def set(self, **attributes):
+        with self._lock:
+            self.attributes.update(attributes)
+
+    def add(self, name, amount):
+        with self._lock:
+            self.attributes[name] = self.attributes.get(name, 0) + amount
+
+    def fail(self, error):
+        # Errori gestiti (restituiti come testo o None) che non arrivano come eccezione
+        self.status = "error"
+        self.error = str(error)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+        if self.parent is not None:
+            for name in self.ROLLUP_ATTRIBUTES:
+                if name in self.attributes:
+                    self.parent.add(name, self.attributes[name])
+        _emit(self)
+        metrics.observe_span(self)
+
+    def to_dict(self):
+        record = {
+            "ts": self.timestamp,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "duration_ms": round(self.duration * 1000, 2),
+            "status": self.status,
+        }
+        if self.error:
+            record["error"] = self.error
+        record.update(self.attributes)
+        return record
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Apre uno span figlio dello span corrente:
+
+        with telemetry.span("github", user=username) as s:
+            s.set(repos=5)
+    """
+    opened = Span(name, _current_span.get(), **attributes)
+    token = _current_span.set(opened)
+    try:
+        yield opened
+    except BaseException as e:
+        opened.fail(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_span.reset(token)
+        opened.finish()
+
+
+def current_span():
+    return _current_span.get()
+
+
+def bind(func):
+    """
+    Porta lo span corrente nei thread di un executor: gli span aperti da `func`
+    restano figli dello stadio che l'ha lanciata.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # Una copia per chiamata: lo stesso Context non può girare in due thread
+        return context.copy().run(func, *args, **kwargs)
+
+    return run
+
+
+def record_http(response, target=None):
+    """
+    Registra status, byte e host di una risposta HTTP sullo span indicato
+    (di default quello corrente) e nei contatori (host fuori da METRICS_HOSTS
+    come "other").
+    """
+    target = target or _current_span.get()
+    size = len(response.content) if response.content is not None else 0
+    cache_state = "hit" if getattr(response, "from_cache", False) else "network"
+    host = urlparse(response.url or "").hostname
+    if host not in METRICS_HOSTS:
+        host = "other"
+    if target is not None:
+        target.set(status=response.status_code, cache=cache_state)
+        target.add("cached_bytes" if cache_state == "hit" else "bytes", size)
+    metrics.inc("http_responses_total", host=host, status=response.status_code)
+    metrics.inc("http_bytes_total", size, host=host, cache=cache_state)
+
+
+def record_usage(usage, model, target=None):
+    """
+    Token prompt/completion dal campo `usage` di una completion OpenAI.
+    """
+    target = target or _current_span.get()
+    if usage is None:
+        return
+    prompt_tokens = usage.prompt_tokens or 0
+    completion_tokens = usage.completion_tokens or 0
+    if target is not None:
+        target.set(model=model)
+        target.add("prompt_tokens", prompt_tokens)
+        target.add("completion_tokens", completion_tokens)
+    metrics.inc("llm_tokens_total", prompt_tokens, model=model, type="prompt")
+    metrics.inc("llm_tokens_total", completion_tokens, model=model, type="completion")
+
+
+# --- LOG JSON ---
+def _emit(finished):
+    global _log_file
+    if TELEMETRY_LOG == "off":
+        return
+    line = json.dumps(finished.to_dict(), ensure_ascii=False, default=str)
+    with _log_lock:
+        try:
+            if TELEMETRY_LOG == "stderr":
+                print(line, file=sys.stderr, flush=True)
+                return
+            if _log_file is None:
+                _log_file = open(TELEMETRY_LOG, "a", encoding="utf-8")
+            _log_file.write(line + "\n")
+            _log_file.flush()
+        except OSError as e:
+            # La telemetria non deve mai bloccare l'analisi
+            print(f"[TELEMETRY] Log non scrivibile: {e}")
+
+
+# --- METRICHE PROMETHEUS ---
+class MetricsRegistry:
+    """
+    Contatori e istogrammi in memoria, esposti nel formato testo di Prometheus.
+    """
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {
+                    "buckets": [0] * len(self.buckets),
+                    "count": 0,
+                    "sum": 0.0,
+                }
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["count"] += 1
+            histogram["sum"] += value
+
+    def observe_span(self, finished):
+        self.observe(
+            "stage_duration_seconds",
+            finished.duration,
+            stage=finished.name,
+            status=finished.status,
+        )
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: dict(value, buckets=list(value["buckets"]))
+                for key, value in self._histograms.items()
+            }
+
+        lines = []
+        seen = set()
+        for (name, labels), value in sorted(counters.items(), key=str):
+            full_name = f"{METRICS_PREFIX}_{name}"
+            if full_name not in seen:
+                lines.append(f"# TYPE {full_name} counter")
+                seen.add(full_name)
+            lines.append(f"{full_name}{_format_labels(labels)} {value}")
+
+        for (name, labels), histogram in sorted(histograms.items(), key=str):
+            full_name = f"{METRICS_PREFIX}_{name}"
+            if full_name not in seen:
+                lines.append(f"# TYPE {full_name} histogram")
+                seen.add(full_name)
+            for bound, count in zip(self.buckets, histogram["buckets"]):
+                bucket_labels = labels + (("le", repr(float(bound))),)
+                lines.append(
+                    f"{full_name}_bucket{_format_labels(bucket_labels)} {count}"
+                )
+            inf_labels = labels + (("le", "+Inf"),)
+            lines.append(
+                f"{full_name}_bucket{_format_labels(inf_labels)} {histogram['count']}"
+            )
+            lines.append(f"{full_name}_sum{_format_labels(labels)} {histogram['sum']}")
+            lines.append(
+                f"{full_name}_count{_format_labels(labels)} {histogram['count']}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+metrics = MetricsRegistry()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_metrics_server = None
+_metrics_lock = threading.Lock()
+
+
+def start_metrics_server(port, host=METRICS_HOST):
+    """
+    Avvia (una volta per processo) l'endpoint /metrics in un thread daemon.
+    Restituisce il server, o None se la porta non è disponibile.
+    """
+    global _metrics_server
+    with _metrics_lock:
+        if _metrics_server is None:
+            try:
+                server = ThreadingHTTPServer((host, port), MetricsHandler)
+            except OSError as e:
+                print(f"[TELEMETRY] Endpoint metriche non avviato su {port}: {e}")
+                return None
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            _metrics_server = server
+            print(
+                f"[TELEMETRY] Metriche su http://{host}:{server.server_port}/metrics"
+            )
+    return _metrics_server
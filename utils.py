@@ -1,91 +1,742 @@
-import fitz  # PyMuPDF
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
 import requests
 
+import cv_sections
+import github_profile
+import html_extract
+import http_client
+import settings
+import single_flight
+import telemetry
+
+# --- ENDPOINT ESTERNI ---
+# Sovrascrivibili (es. dai benchmark con server locali)
+GITHUB_API_URL = "https://api.github.com"
+GITHUB_RAW_URL = "https://raw.githubusercontent.com"
+GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
+JINA_READER_URL = "https://r.jina.ai"
+
+# --- GITHUB ---
+GITHUB_REPO_COUNT = 5  # Repo più recenti analizzate per profilo
+# Numero massimo di README scaricati in parallelo (modalità REST)
+GITHUB_MAX_CONCURRENCY = 5
+# Richieste lasciate di riserva: sotto questa soglia si smette di usare la risorsa
+# (GraphQL -> REST) fino al reset indicato da X-RateLimit-Reset
+GITHUB_RATE_LIMIT_RESERVE = 10
+GITHUB_GRAPHQL_CACHE_TTL = 60 * 60  # Come la cache HTTP delle chiamate REST
+GITHUB_GRAPHQL_CACHE_MAX_ENTRIES = 64
+# Profilo completo (Secrets o variabile d'ambiente GITHUB_DEEP_PROFILE = "1"):
+# oltre alle repo recenti, tutte le repo pubbliche riassunte da github_profile.py
+GITHUB_DEEP_PROFILE = False
+GITHUB_PROFILE_PAGE_SIZE = 100  # Massimo consentito dalla API
+GITHUB_PROFILE_MAX_PAGES = 10  # Fino a 1000 repo per profilo
+# Pagine e dettagli dei linguaggi in parallelo (come http_client.POOL_MAXSIZE)
+GITHUB_PROFILE_MAX_CONCURRENCY = 16
+# Repo (non fork, push più recente) di cui si scaricano i byte per linguaggio:
+# una richiesta ciascuna, su 5000/ora con token e 60/ora senza
+GITHUB_PROFILE_LANGUAGE_REPOS = 100
+GITHUB_PROFILE_LANGUAGE_REPOS_ANONYMOUS = 10
+
+# Modalità GraphQL (con GITHUB_TOKEN): repo, README del branch di default,
+# topic e stelle in una sola richiesta invece di 1 + fino a 2 per repo.
+GITHUB_GRAPHQL_QUERY = """
+query($login: String!, $count: Int!) {
+  repositoryOwner(login: $login) {
+    repositories(
+      first: $count
+      privacy: PUBLIC
+      ownerAffiliations: OWNER
+      orderBy: {field: UPDATED_AT, direction: DESC}
+    ) {
+      nodes {
+        name
+        description
+        stargazerCount
+        primaryLanguage { name }
+        repositoryTopics(first: 10) { nodes { topic { name } } }
+        readme: object(expression: "HEAD:README.md") { ... on Blob { text } }
+        readmeLower: object(expression: "HEAD:readme.md") { ... on Blob { text } }
+      }
+    }
+  }
+}
+"""
+
+# --- WEB ---
+WEB_MAX_CONCURRENCY = 5  # URL letti / validati in parallelo
+LINK_PREFETCH_MAX_BYTES = 256 * 1024  # Lettura massima in validazione (GET parziale)
+# Estrazione del testo delle pagine (Secrets o variabile d'ambiente WEB_EXTRACTOR):
+#   "jina"   r.jina.ai restituisce la pagina già pulita (default)
+#   "local"  pagina scaricata direttamente e convertita qui (html_extract.py)
+WEB_EXTRACTOR = "jina"
+# Modalità local: sotto questa quantità di testo (pagine renderizzate in JS)
+# si ripiega su r.jina.ai
+WEB_LOCAL_MIN_CHARS = 200
+# Trucco: Ci fingiamo un browser vero (Chrome) per non essere bloccati da Behance
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# Esito della validazione di un URL; body = pagina completa se già scaricata
+LinkCheck = namedtuple("LinkCheck", ["url", "is_valid", "error", "body"])
+
+# Limiti grezzi di sicurezza per sorgente: il budget reale del prompt
+# (in token, per priorità) viene applicato da context_packer.py
+README_MAX_CHARS = 4000
+WEB_PAGE_MAX_CHARS = 8000
+# Byte letti al massimo per risposta (http_client.read_limited). I testi oltre
+# il limite vengono troncati, le risposte JSON oltre il limite scartate.
+README_MAX_BYTES = 64 * 1024  # Ne servono README_MAX_CHARS caratteri
+JINA_MAX_BYTES = 256 * 1024  # Testo già pulito: ne servono WEB_PAGE_MAX_CHARS
+WEB_PAGE_MAX_BYTES = 2 * 1024 * 1024  # HTML grezzo: il contenuto può essere in fondo
+GITHUB_API_MAX_BYTES = 4 * 1024 * 1024  # JSON (GraphQL include i README interi)
+
+# --- PDF ---
+# PyMuPDF (fitz) viene importato al primo PDF, non all'avvio dell'app
+PDF_CACHE_MAX_ENTRIES = 32  # Risultati memorizzati per hash del contenuto (LRU)
+
+_pdf_cache = OrderedDict()
+_pdf_lock = threading.Lock()
+
+_github_graphql_cache = OrderedDict()
+_github_graphql_lock = threading.Lock()
+
+# Sessioni concorrenti sullo stesso profilo / URL condividono un solo fetch
+_github_flight = single_flight.group("github")
+_web_flight = single_flight.group("web")
+
+
+class GitHubRateLimit:
+    """
+    Budget residuo delle API GitHub per risorsa ("core" per REST, "graphql"),
+    aggiornato dagli header X-RateLimit-* di ogni risposta dalla rete.
+    """
 
-def get_github_dna(username):
+    def __init__(self, reserve=GITHUB_RATE_LIMIT_RESERVE):
+        self.reserve = reserve
+        self._budget = {}
+        self._lock = threading.Lock()
+
+    def update(self, response, default_resource="core"):
+        # Le risposte dalla cache riportano header vecchi: non contano
+        if getattr(response, "from_cache", False):
+            return
+        headers = response.headers
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        resource = headers.get("X-RateLimit-Resource", default_resource)
+        with self._lock:
+            self._budget[resource] = (int(remaining), int(reset))
+        span = telemetry.current_span()
+        if span is not None:
+            span.set(rate_limit_remaining=int(remaining), rate_limit_resource=resource)
+
+    def available(self, resource):
+        with self._lock:
+            budget = self._budget.get(resource)
+        if budget is None:
+            return True
+        remaining, reset = budget
+        return remaining > self.reserve or time.time() >= reset
+
+    def spendable(self, resource):
+        """
+        Richieste utilizzabili prima della riserva; None se il budget non è noto.
+        """
+        with self._lock:
+            budget = self._budget.get(resource)
+        if budget is None or time.time() >= budget[1]:
+            return None
+        return max(0, budget[0] - self.reserve)
+
+
+github_rate_limit = GitHubRateLimit()
+
+
+def _github_token():
+    return settings.get_setting("GITHUB_TOKEN") or None
+
+
+def _github_deep_profile():
+    return settings.get_flag("GITHUB_DEEP_PROFILE", GITHUB_DEEP_PROFILE)
+
+
+def _github_project(name, lang, desc, readme, stars=None, topics=()):
+    # Blocco di una repo nel contesto; stelle e topic solo dalla modalità GraphQL
+    header = f"PROJECT: {name} (Main Lang: {lang}"
+    header += f", Stars: {stars})" if stars is not None else ")"
+    block = f"{header}\nDESC: {desc}\n"
+    if topics:
+        block += f"TOPICS: {', '.join(topics)}\n"
+    return block + f"README SUMMARY: {readme}\n---\n"
+
+
+def _fetch_readme(username, name):
     """
-    Recupera i dati dei progetti recenti da GitHub.
+    Prende il README raw per capire la logica del progetto.
+    Prova prima il branch main, poi master.
     """
-    if not username:
-        return ""
+    for branch in ("main", "master"):
+        readme_url = (
+            f"{GITHUB_RAW_URL}/{username}/{name}/{branch}/README.md"
+        )
+        try:
+            readme_response = http_client.get(
+                readme_url,
+                cache=True,
+                timeout=10,
+                max_bytes=README_MAX_BYTES,
+                truncate=True,
+                content_types=http_client.TEXT_TYPES,
+            )
+        except http_client.PayloadRejected as e:
+            print(f"[GITHUB] README di {name} scartato: {e}")
+            continue
+        if readme_response.status_code == 200:
+            return readme_response.text[:README_MAX_CHARS]
+    return "No Readme found"
+
+
+def _github_dna_graphql(username, token):
+    """
+    Modalità GraphQL: una sola richiesta per profilo.
+    Restituisce None se la richiesta fallisce (il chiamante ripiega su REST).
+    """
+    key = (username.lower(), GITHUB_REPO_COUNT)
+    with _github_graphql_lock:
+        cached = _github_graphql_cache.get(key)
+        if cached and time.time() - cached[0] < GITHUB_GRAPHQL_CACHE_TTL:
+            _github_graphql_cache.move_to_end(key)
+            return cached[1]
 
     try:
-        # 1. Recupera le repo (ordinate per aggiornamento)
-        url = f"https://api.github.com/users/{username}/repos?sort=updated&per_page=5"
-        response = requests.get(url)
+        response = http_client.post(
+            GITHUB_GRAPHQL_URL,
+            json={
+                "query": GITHUB_GRAPHQL_QUERY,
+                "variables": {"login": username, "count": GITHUB_REPO_COUNT},
+            },
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=10,
+            max_bytes=GITHUB_API_MAX_BYTES,
+            content_types=http_client.TEXT_TYPES,
+        )
+    except http_client.PayloadRejected as e:
+        print(f"[GITHUB] Risposta GraphQL scartata ({e}), ripiego su REST")
+        return None
+    github_rate_limit.update(response, default_resource="graphql")
+    if response.status_code != 200:
+        print(f"[GITHUB] GraphQL status {response.status_code}, ripiego su REST")
+        return None
+
+    payload = response.json()
+    owner = (payload.get("data") or {}).get("repositoryOwner")
+    if owner is None:
+        if any(e.get("type") == "NOT_FOUND" for e in payload.get("errors", [])):
+            return f"Errore GitHub: Utente {username} non trovato."
+        print(f"[GITHUB] Errore GraphQL {payload.get('errors')}, ripiego su REST")
+        return None
+
+    context_str = "### GITHUB PORTFOLIO ###\n"
+    repos = owner["repositories"]["nodes"]
+    for repo in repos:
+        readme = repo.get("readme") or repo.get("readmeLower") or {}
+        context_str += _github_project(
+            repo["name"],
+            (repo.get("primaryLanguage") or {}).get("name", "Unknown"),
+            repo.get("description") or "No description",
+            (readme.get("text") or "No Readme found")[:README_MAX_CHARS],
+            stars=repo.get("stargazerCount", 0),
+            topics=[
+                node["topic"]["name"]
+                for node in repo["repositoryTopics"]["nodes"]
+            ],
+        )
+
+    with _github_graphql_lock:
+        _github_graphql_cache[key] = (time.time(), context_str)
+        while len(_github_graphql_cache) > GITHUB_GRAPHQL_CACHE_MAX_ENTRIES:
+            _github_graphql_cache.popitem(last=False)
+    return context_str
 
-        if response.status_code != 200:
-            return f"Errore GitHub: Utente {username} non trovato o API limit. Status: {response.status_code}"
 
-        repos = response.json()
+def _github_dna_rest(username, max_concurrency, token=None):
+    """
+    Modalità REST: lista repo, poi i README raw in parallelo
+    (max `max_concurrency` alla volta) provando i branch main e master.
+    """
+    # 1. Recupera le repo (ordinate per aggiornamento)
+    url = (
+        f"{GITHUB_API_URL}/users/{username}/repos"
+        f"?sort=updated&per_page={GITHUB_REPO_COUNT}"
+    )
+    headers = {"Authorization": f"Bearer {token}"} if token else None
+    response = http_client.get(
+        url,
+        cache=True,
+        headers=headers,
+        timeout=10,
+        max_bytes=GITHUB_API_MAX_BYTES,
+        content_types=http_client.TEXT_TYPES,
+    )
+    github_rate_limit.update(response)
+
+    if response.status_code != 200:
+        return f"Errore GitHub: Utente {username} non trovato o API limit. Status: {response.status_code}"
+
+    repos = response.json()
+
+    # 2. README in parallelo: map() restituisce i risultati nell'ordine delle repo
+    names = [repo.get("name", "Unknown") for repo in repos]
+    if names:
+        workers = max(1, min(max_concurrency, len(names)))
+        fetch = telemetry.bind(lambda name: _fetch_readme(username, name))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            readmes = list(executor.map(fetch, names))
+    else:
+        readmes = []
+
+    context_str = "### GITHUB PORTFOLIO ###\n"
+
+    for repo, name, readme_content in zip(repos, names, readmes):
+        desc = repo.get("description", "No description")
+        lang = repo.get("language", "Unknown")
+        context_str += _github_project(name, lang, desc, readme_content)
 
-        context_str = "### GITHUB PORTFOLIO ###\n"
+    return context_str
 
-        for repo in repos:
-            name = repo.get("name", "Unknown")
-            desc = repo.get("description", "No description")
-            lang = repo.get("language", "Unknown")
 
-            # 2. Prendi il README raw per capire la logica del progetto
-            readme_url = (
-                f"https://raw.githubusercontent.com/{username}/{name}/main/README.md"
+def _github_repo_page(username, page, headers):
+    # Una pagina della lista completa, ordinata per ultimo push
+    response = http_client.get(
+        f"{GITHUB_API_URL}/users/{username}/repos"
+        f"?sort=pushed&per_page={GITHUB_PROFILE_PAGE_SIZE}&page={page}",
+        cache=True,
+        headers=headers,
+        timeout=10,
+        max_bytes=GITHUB_API_MAX_BYTES,
+        content_types=http_client.TEXT_TYPES,
+    )
+    github_rate_limit.update(response)
+    if response.status_code != 200:
+        raise requests.HTTPError(f"pagina {page}: status {response.status_code}")
+    return response
+
+
+def _last_page(response):
+    # Header Link della API: rel="last" porta il numero dell'ultima pagina
+    links = requests.utils.parse_header_links(response.headers.get("Link", ""))
+    for link in links:
+        if link.get("rel") == "last":
+            page = parse_qs(urlparse(link["url"]).query).get("page", ["1"])[0]
+            return int(page) if page.isdigit() else 1
+    return 1
+
+
+def _github_all_repos(username, headers, max_concurrency, cancelled):
+    """
+    Tutte le repo pubbliche: la prima pagina dice quante sono le altre
+    (header Link), che vengono scaricate in parallelo.
+    Con `cancelled` impostato le pagine non ancora partite vengono saltate.
+    """
+    first = _github_repo_page(username, 1, headers)
+    pages = min(_last_page(first), GITHUB_PROFILE_MAX_PAGES)
+    repos = first.json()
+    if pages > 1 and not cancelled.is_set():
+        workers = max(1, min(max_concurrency, pages - 1))
+        fetch = telemetry.bind(
+            lambda page: (
+                []
+                if cancelled.is_set()
+                else _github_repo_page(username, page, headers).json()
             )
-            readme_response = requests.get(readme_url)
-            # Se main fallisce, prova master
-            if readme_response.status_code != 200:
-                readme_url = f"https://raw.githubusercontent.com/{username}/{name}/master/README.md"
-                readme_response = requests.get(readme_url)
-
-            readme_content = (
-                readme_response.text[:1000]
-                if readme_response.status_code == 200
-                else "No Readme found"
+        )
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for page_repos in executor.map(fetch, range(2, pages + 1)):
+                repos.extend(page_repos)
+    return repos, pages
+
+
+def _fetch_languages(username, name, headers):
+    # Byte per linguaggio di una repo; None se non disponibili
+    try:
+        response = http_client.get(
+            f"{GITHUB_API_URL}/repos/{username}/{name}/languages",
+            cache=True,
+            headers=headers,
+            timeout=10,
+            max_bytes=GITHUB_API_MAX_BYTES,
+            content_types=http_client.TEXT_TYPES,
+        )
+    except http_client.PayloadRejected as e:
+        print(f"[GITHUB] Linguaggi di {name} scartati: {e}")
+        return None
+    github_rate_limit.update(response)
+    return response.json() if response.status_code == 200 else None
+
+
+def _github_profile(
+    username, token, cancelled, max_concurrency=GITHUB_PROFILE_MAX_CONCURRENCY
+):
+    """
+    Modalità deep: lista completa delle repo e byte per linguaggio in
+    parallelo, ridotti da github_profile.py a un blocco di poche righe.
+    Restituisce "" se il profilo non è disponibile (il contesto base resta)
+    o se `cancelled` viene impostato: le richieste non ancora partite saltano.
+    """
+    with telemetry.span("github.profile", user=username) as stage:
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        try:
+            repos, pages = _github_all_repos(
+                username, headers, max_concurrency, cancelled
+            )
+            if cancelled.is_set():
+                stage.set(cancelled=True)
+                return ""
+            limit = (
+                GITHUB_PROFILE_LANGUAGE_REPOS
+                if token
+                else GITHUB_PROFILE_LANGUAGE_REPOS_ANONYMOUS
             )
+            # Dettaglio dei linguaggi solo entro il budget di rate limit residuo
+            spendable = github_rate_limit.spendable("core")
+            if spendable is not None:
+                limit = min(limit, spendable)
+            names = [repo["name"] for repo in repos if not repo.get("fork")][:limit]
+
+            languages = {}
+            if names:
+                workers = max(1, min(max_concurrency, len(names)))
+                fetch = telemetry.bind(
+                    lambda name: (
+                        None
+                        if cancelled.is_set()
+                        else _fetch_languages(username, name, headers)
+                    )
+                )
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    for name, breakdown in zip(names, executor.map(fetch, names)):
+                        if breakdown:
+                            languages[name] = breakdown
+            stage.set(repos=len(repos), pages=pages, language_calls=len(names))
+            if cancelled.is_set():
+                stage.set(cancelled=True)
+                return ""
+            return github_profile.build_profile(repos, languages)
+        except Exception as e:
+            stage.fail(str(e))
+            print(f"[GITHUB] Profilo completo non disponibile: {e}")
+            return ""
 
-            context_str += f"PROJECT: {name} (Main Lang: {lang})\n"
-            context_str += f"DESC: {desc}\n"
-            context_str += f"README SUMMARY: {readme_content}\n---\n"
 
+def get_github_dna(username, max_concurrency=GITHUB_MAX_CONCURRENCY):
+    """
+    Recupera i dati dei progetti recenti da GitHub.
+    Con GITHUB_TOKEN (Secrets o ambiente) usa una sola query GraphQL per profilo,
+    finché il budget di rate limit lo consente; altrimenti la modalità REST.
+    Con GITHUB_DEEP_PROFILE aggiunge in testa il riepilogo di tutte le repo.
+    """
+    if not username:
+        return ""
+
+    deep = _github_deep_profile()
+    with telemetry.span("github", user=username, deep=deep) as stage:
+        context_str = _github_flight.do(
+            (username, max_concurrency, deep),
+            _github_dna,
+            username,
+            max_concurrency,
+            deep,
+            stage,
+        )
+        if context_str.startswith("Errore"):
+            stage.fail(context_str)
         return context_str
+
+
+def _github_dna(username, max_concurrency, deep, stage):
+    # Eseguita una volta per profilo anche con più sessioni in attesa
+    try:
+        token = _github_token()
+        if not deep:
+            return _github_base(username, max_concurrency, token, stage)
+
+        # Il profilo completo non dipende dalle repo recenti: parte in parallelo
+        # e si ferma se il contesto base fallisce (utente inesistente, limiti)
+        cancelled = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=1)
+        profile = executor.submit(
+            telemetry.bind(_github_profile), username, token, cancelled
+        )
+        try:
+            context_str = _github_base(username, max_concurrency, token, stage)
+        except BaseException:
+            cancelled.set()
+            raise
+        finally:
+            executor.shutdown(wait=False)
+        if context_str.startswith("Errore"):
+            cancelled.set()
+            profile.cancel()
+            return context_str
+        # Primo blocco dopo l'intestazione: corto, entra sempre nel budget
+        header, _, projects = context_str.partition("\n")
+        return f"{header}\n{profile.result()}{projects}"
     except Exception as e:
         return f"Errore durante l'analisi GitHub: {str(e)}"
 
 
-def get_web_dna(urls_text):
+def _github_base(username, max_concurrency, token, stage):
+    # Repo recenti con README: GraphQL con token e budget, altrimenti REST
+    context_str = None
+    if token and github_rate_limit.available("graphql"):
+        stage.set(mode="graphql")
+        context_str = _github_dna_graphql(username, token)
+    elif token:
+        print("[GITHUB] Budget GraphQL esaurito, uso REST fino al reset")
+
+    if context_str is None:
+        stage.set(mode="rest")
+        context_str = _github_dna_rest(username, max_concurrency, token)
+    return context_str
+
+
+def split_urls(urls_text):
     """
-    Estrae contenuto da una lista di URL (separati da virgola o a capo)
-    usando r.jina.ai per pulizia testo.
+    Separa gli URL (virgola o a capo) e aggiunge https:// dove manca.
     """
     if not urls_text:
+        return []
+    urls = []
+    for url in urls_text.replace("\n", ",").split(","):
+        url = url.strip()
+        if not url:
+            continue
+        if not url.startswith(("http://", "https://")):
+            url = "https://" + url
+        urls.append(url)
+    return urls
+
+
+def _html_to_text(html):
+    # Testo leggibile di una pagina HTML (html_extract.py), nel thread chiamante
+    return html_extract.html_to_text(html, WEB_PAGE_MAX_CHARS)
+
+
+def _decode_html(response):
+    # Senza charset nell'header requests assume ISO-8859-1: per l'HTML meglio UTF-8
+    if "charset" in response.headers.get("Content-Type", ""):
+        return response.text
+    return response.content.decode("utf-8", errors="replace")
+
+
+def _web_extractor():
+    mode = str(settings.get_setting("WEB_EXTRACTOR") or WEB_EXTRACTOR).lower()
+    return mode if mode in ("jina", "local") else WEB_EXTRACTOR
+
+
+def _web_source(url, prefetched_body=None):
+    """
+    Blocco SOURCE/CONTENT per un singolo URL.
+    Se la pagina è già stata scaricata in validazione la riusiamo (se il testo
+    basta, come in _local_source), altrimenti la leggiamo secondo WEB_EXTRACTOR
+    (r.jina.ai o estrazione locale).
+    """
+    source = "prefetched" if prefetched_body is not None else _web_extractor()
+    with telemetry.span("web.source", url=url, source=source) as stage:
+        if prefetched_body is not None:
+            clean_text = _html_to_text(prefetched_body)
+            if len(clean_text) >= WEB_LOCAL_MIN_CHARS:
+                return f"SOURCE: {url}\nCONTENT:\n{clean_text}\n---\n"
+            # Pagina generata in JS: il corpo scaricato non ha il contenuto
+            print(f"[WEB] Pagina già scaricata insufficiente per {url}, uso r.jina.ai")
+            source = "jina"
+            stage.set(source=source)
+
+        fetch = _local_source if source == "local" else _jina_source
+        block, error = _web_flight.do((source, url), fetch, url)
+        if error:
+            stage.fail(error)
+        return block
+
+
+def _local_source(url):
+    """
+    Blocco SOURCE/CONTENT dalla pagina scaricata direttamente e convertita in
+    testo localmente. Pagine non HTML o quasi vuote (contenuto generato in JS)
+    passano da r.jina.ai. Restituisce (blocco, errore o None).
+    """
+    try:
+        response = http_client.get(
+            url,
+            cache=True,
+            headers=BROWSER_HEADERS,
+            timeout=10,
+            max_bytes=WEB_PAGE_MAX_BYTES,
+            truncate=True,
+            content_types=http_client.HTML_TYPES,
+        )
+        if response.status_code != 200:
+            return (
+                f"SOURCE: {url} (Error {response.status_code})\n---\n",
+                f"status {response.status_code}",
+            )
+        clean_text = _html_to_text(_decode_html(response))
+        if len(clean_text) >= WEB_LOCAL_MIN_CHARS:
+            return f"SOURCE: {url}\nCONTENT:\n{clean_text}\n---\n", None
+        print(f"[WEB] Estrazione locale insufficiente per {url}, uso r.jina.ai")
+        return _jina_source(url)
+
+    except http_client.PayloadRejected:
+        # PDF, immagini...: r.jina.ai sa leggerli, l'estrattore locale no
+        print(f"[WEB] {url} non è una pagina HTML, uso r.jina.ai")
+        return _jina_source(url)
+    except Exception as e:
+        return f"SOURCE: {url} (Exception: {str(e)})\n---\n", str(e)
+
+
+def _jina_source(url):
+    """
+    Blocco SOURCE/CONTENT letto da r.jina.ai, eseguito una volta per URL anche
+    con più sessioni in attesa. Restituisce (blocco, errore o None).
+    """
+    try:
+        # Il trucco magico: prependi https://r.jina.ai/ all'URL
+        jina_url = f"{JINA_READER_URL}/{url}"
+
+        # Questo restituisce il testo della pagina già pulito per l'LLM
+        response = http_client.get(
+            jina_url,
+            cache=True,
+            timeout=10,
+            max_bytes=JINA_MAX_BYTES,
+            truncate=True,
+            content_types=http_client.TEXT_TYPES,
+        )
+
+        if response.status_code == 200:
+            # Limite grezzo: il budget in token lo decide context_packer.py
+            clean_text = response.text[:WEB_PAGE_MAX_CHARS]
+            return f"SOURCE: {url}\nCONTENT:\n{clean_text}\n---\n", None
+        return (
+            f"SOURCE: {url} (Error {response.status_code})\n---\n",
+            f"jina status {response.status_code}",
+        )
+
+    except Exception as e:
+        return f"SOURCE: {url} (Exception: {str(e)})\n---\n", str(e)
+
+
+def get_web_dna(urls_text, prefetched=None, max_concurrency=WEB_MAX_CONCURRENCY):
+    """
+    Estrae contenuto da una lista di URL (separati da virgola o a capo)
+    usando r.jina.ai per pulizia testo. Le pagine vengono lette in parallelo.
+    `prefetched` ({url: body}) contiene i corpi già scaricati da validate_links,
+    che non vengono riscaricati.
+    """
+    urls = split_urls(urls_text)
+    if not urls:
         return ""
 
-    # Pulisce e separa gli URL
-    urls = [u.strip() for u in urls_text.replace("\n", ",").split(",") if u.strip()]
+    prefetched = prefetched or {}
+    workers = max(1, min(max_concurrency, len(urls)))
+    with telemetry.span("web", urls=len(urls), prefetched=len(prefetched)):
+        fetch = telemetry.bind(lambda url: _web_source(url, prefetched.get(url)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            blocks = executor.map(fetch, urls)
+            return "### WEB & CREATIVE PORTFOLIO ###\n" + "".join(blocks)
 
-    context_str = "### WEB & CREATIVE PORTFOLIO ###\n"
 
-    for url in urls:
-        if not url.startswith("http"):
-            url = "https://" + url
+def _check_link(url):
+    """
+    Verifica di un URL misurata come span "link.check" (status, byte letti).
+    """
+    with telemetry.span("link.check", url=url) as stage:
+        check = _probe_link(url, stage)
+        if not check.is_valid:
+            stage.fail(check.error)
+        return check
 
-        try:
-            # Il trucco magico: prependi https://r.jina.ai/ all'URL
-            jina_url = f"https://r.jina.ai/{url}"
 
-            # Questo restituisce il testo della pagina già pulito per l'LLM
-            response = requests.get(jina_url, timeout=10)
+def _probe_link(url, stage):
+    """
+    Verifica leggera di un singolo URL: HEAD, e se il server non la supporta
+    una GET parziale (Range) letta al massimo per LINK_PREFETCH_MAX_BYTES.
+    Restituisce un LinkCheck; `body` è valorizzato solo se la pagina è stata
+    scaricata per intero, così get_web_dna può riusarla.
+    """
+    try:
+        # Facciamo una chiamata leggera (timeout 5 secondi per non bloccare l'app)
+        response = http_client.head(
+            url, headers=BROWSER_HEADERS, timeout=5, allow_redirects=True
+        )
+        stage.set(method="HEAD", status=response.status_code)
+        if response.status_code == 200:
+            return LinkCheck(url, True, None, None)
+
+        # Molti siti rifiutano HEAD (403/405/501): riproviamo con una GET parziale
+        ranged = dict(BROWSER_HEADERS, Range=f"bytes=0-{LINK_PREFETCH_MAX_BYTES - 1}")
+        try:
+            response = http_client.get(
+                url,
+                headers=ranged,
+                timeout=5,
+                max_bytes=LINK_PREFETCH_MAX_BYTES,
+                truncate=True,
+                content_types=http_client.HTML_TYPES,
+            )
+            is_html = True
+        except http_client.PayloadRejected as e:
+            # Non HTML (PDF, immagine...): conta solo lo status, nessun corpo
+            response, is_html = e.response, False
+        stage.set(method="GET", status=response.status_code)
+        if response.status_code not in (200, 206):
+            # Se è 403 (Forbidden) o 404 (Not Found) o altro
+            return LinkCheck(url, False, f"Server Error {response.status_code}", None)
+        if not is_html:
+            # Link valido ma non HTML: nessun corpo da leggere
+            return LinkCheck(url, True, None, None)
+        size = len(response.content)
+        stage.add("bytes", size)
+
+        # Corpo completo solo se non abbiamo raggiunto il limite di lettura
+        body = None
+        if size < LINK_PREFETCH_MAX_BYTES and "html" in response.headers.get(
+            "Content-Type", ""
+        ):
+            body = _decode_html(response)
+        return LinkCheck(url, True, None, body)
 
-            if response.status_code == 200:
-                # Tronchiamo per evitare overflow di token se la pagina è enorme
-                clean_text = response.text[:2000]
-                context_str += f"SOURCE: {url}\nCONTENT:\n{clean_text}\n---\n"
-            else:
-                context_str += f"SOURCE: {url} (Error {response.status_code})\n---\n"
+    except requests.exceptions.MissingSchema:
+        return LinkCheck(url, False, "URL malformato", None)
+    except requests.exceptions.ConnectionError:
+        return LinkCheck(url, False, "Sito irraggiungibile", None)
+    except Exception as e:
+        return LinkCheck(url, False, str(e), None)
 
-        except Exception as e:
-            context_str += f"SOURCE: {url} (Exception: {str(e)})\n---\n"
 
-    return context_str
+def validate_links(urls_text, max_concurrency=WEB_MAX_CONCURRENCY):
+    """
+    Valida in parallelo ogni URL del campo (separati da virgola o a capo).
+    Restituisce una lista di LinkCheck(url, is_valid, error, body), uno per URL.
+    """
+    urls = split_urls(urls_text)
+    if not urls:
+        return []
+    workers = max(1, min(max_concurrency, len(urls)))
+    with telemetry.span("validate_links", urls=len(urls)) as stage:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            checks = list(executor.map(telemetry.bind(_check_link), urls))
+        stage.set(invalid=sum(not check.is_valid for check in checks))
+        return checks
 
 
 def validate_optional_link(url):
@@ -98,103 +749,53 @@ def validate_optional_link(url):
         return True, None
 
     # 2. Se l'utente ha dimenticato "http", glielo aggiungiamo noi per gentilezza
-    if not url.startswith(("http://", "https://")):
-        url = "https://" + url
+    check = _check_link(split_urls(url)[0])
+    return check.is_valid, check.error
 
-    try:
-        # Trucco: Ci fingiamo un browser vero (Chrome) per non essere bloccati da Behance
-        fake_browser = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
 
-        # Facciamo una chiamata leggera (timeout 5 secondi per non bloccare l'app)
-        response = requests.get(url, headers=fake_browser, timeout=5)
+def _extract_pages(pdf_bytes):
+    # Testo di ogni pagina, nel thread chiamante
+    import fitz  # PyMuPDF
 
-        # Se il codice è 200 (OK), il link esiste
-        if response.status_code == 200:
-            return True, None
-        # Se è 403 (Forbidden) o 404 (Not Found) o altro
-        else:
-            return False, f"Server Error {response.status_code}"
-
-    except requests.exceptions.MissingSchema:
-        return False, "URL malformato"
-    except requests.exceptions.ConnectionError:
-        return False, "Sito irraggiungibile"
-    except Exception as e:
-        return False, str(e)
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return [page.get_text() for page in doc]
 
 
 def extract_text_from_pdf(file_stream):
     """
     Estrae tutto il testo da un file stream PDF.
     Restituisce una stringa pulita.
+    Il risultato è memorizzato per hash del contenuto: i rerun di Streamlit
+    con lo stesso file caricato non rileggono il PDF.
     """
-    text = ""
-    try:
-        # Apre il PDF direttamente dallo stream di byte di Streamlit
-        with fitz.open(stream=file_stream.read(), filetype="pdf") as doc:
-            for page in doc:
-                text += page.get_text() + "\n"
-
-        # --- Parsing Intelligente (Logica Utente) ---
-        sezioni = {
-            "Profilo": [],
-            "Esperienza": [],
-            "Formazione": [],
-            "Competenze": [],
-            "Lingue": [],
-            "Altro": [],
-        }
-
-        current_section = "Altro"
-        # Usiamo text.splitlines() per analizzare riga per riga
-        for riga in text.splitlines():
-            riga_clean = riga.strip()
-            if not riga_clean:
-                continue
-
-            riga_lower = riga_clean.lower()
-
-            # Euristiche semplici per cambio sezione
-            if (
-                "profilo" in riga_lower
-                or "profile" in riga_lower
-                or "summary" in riga_lower
-            ):
-                current_section = "Profilo"
-            elif (
-                "esperienza" in riga_lower
-                or "experience" in riga_lower
-                or "lavorativ" in riga_lower
-            ):
-                current_section = "Esperienza"
-            elif (
-                "formazione" in riga_lower
-                or "education" in riga_lower
-                or "istruzione" in riga_lower
-            ):
-                current_section = "Formazione"
-            elif (
-                "competenze" in riga_lower
-                or "skills" in riga_lower
-                or "capacità" in riga_lower
-            ):
-                current_section = "Competenze"
-            elif "lingue" in riga_lower or "languages" in riga_lower:
-                current_section = "Lingue"
-
-            # Aggiunge contenuto
-            sezioni[current_section].append(riga_clean)
-
-        # Ricostruzione Testo Strutturato
-        formatted_output = ""
-        for sec_name, lines in sezioni.items():
-            if lines:  # Solo se c'è contenuto
-                formatted_output += f"\n--- {sec_name.upper()} ---\n"
-                formatted_output += "\n".join(lines) + "\n"
-
-        return formatted_output.strip()
+    with telemetry.span("pdf") as stage:
+        try:
+            # Legge i byte dello stream di Streamlit (getvalue non dipende dalla posizione)
+            if hasattr(file_stream, "getvalue"):
+                pdf_bytes = file_stream.getvalue()
+            else:
+                pdf_bytes = file_stream.read()
+            stage.set(pdf_bytes=len(pdf_bytes))
+
+            digest = hashlib.sha256(pdf_bytes).hexdigest()
+            with _pdf_lock:
+                if digest in _pdf_cache:
+                    _pdf_cache.move_to_end(digest)
+                    stage.set(cache="hit")
+                    return _pdf_cache[digest]
+
+            # Parsing Intelligente: classificatore di sezioni compilato (cv_sections.py)
+            pages = _extract_pages(pdf_bytes)
+            stage.set(cache="miss", pages=len(pages))
+            sezioni = cv_sections.default_classifier.split(pages)
+            result = cv_sections.format_sections(sezioni)
+
+            with _pdf_lock:
+                _pdf_cache[digest] = result
+                while len(_pdf_cache) > PDF_CACHE_MAX_ENTRIES:
+                    _pdf_cache.popitem(last=False)
+            return result
 
-    except Exception as e:
-        return f"Errore nella lettura del PDF: {e}"
+        except Exception as e:
+            stage.fail(e)
+            return f"Errore nella lettura del PDF: {e}"